@@ -1,21 +1,46 @@
+import logging
+
+from agent_memory import TokenBudgetMemory
+from code_executor import get_code_executor
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+
 # Define a memory-enabled CodeAgent
 class SimpleCodeAgentWithMemory:
-    def __init__(self, model, system_prompt: str, max_iterations: int = 5):
+    def __init__(self, model, system_prompt: str, max_iterations: int = 5, executor=None, memory=None):
+        """
+        Args:
+        - model: Callable that takes chat messages and returns an OpenAI-style response dict.
+        - system_prompt (str): The system prompt sent with every step.
+        - max_iterations (int): Maximum number of model calls per task.
+        - executor (SandboxedExecutor): Runs the generated code; defaults to the shared pool.
+        - memory (TokenBudgetMemory): Conversation memory; defaults to a 6000 token budget.
+        """
         self.model = model
         self.system_prompt = system_prompt
         self.max_iterations = max_iterations
-        self.memory = []
+        self.memory = memory or TokenBudgetMemory()
+        self.executor = executor
+        self.last_execution = None
+        self.step_tokens = []  # Prompt tokens sent per model call
 
     def add_to_memory(self, role: str, content: str):
-        self.memory.append({"role": role, "content": content})
+        self.memory.add(role, content)
 
     def run(self, task: str) -> str:
         self.add_to_memory("user", task)
 
         for iteration in range(self.max_iterations):
             try:
-                context = [{"role": "system", "content": self.system_prompt}] + self.memory
-                response = self.model(context)
+                context = self.memory.build_context(self.system_prompt)
+                self.step_tokens.append(self.memory.last_context_tokens)
+                logger.debug(f"Agent step {iteration + 1}: {self.memory.last_context_tokens} prompt tokens "
+                             f"({len(context)} messages, summary {'yes' if self.memory.summary else 'no'})")
+                with get_tracer().span("agent_step", step=iteration + 1, prompt_tokens=self.memory.last_context_tokens,
+                                       messages=len(context), summary=bool(self.memory.summary)):
+                    response = self.model(context)
                 llm_output = response["choices"][0]["message"]["content"]
                 self.add_to_memory("assistant", llm_output)
 
@@ -40,13 +65,21 @@ class SimpleCodeAgentWithMemory:
         match = re.search(r"```python(.*?)```", llm_output, re.DOTALL)
         return match.group(1).strip() if match else ""
 
-    @staticmethod
-    def _execute_code(code: str) -> str:
-        safe_globals = {}
-        safe_locals = {}
-
-        try:
-            exec(code, safe_globals, safe_locals)
-            return safe_locals.get("result", "Code executed successfully, but no 'result' was returned.")
-        except Exception as e:
-            return f"Execution error: {e}"
\ No newline at end of file
+    def _execute_code(self, code: str) -> str:
+        """
+        Runs the code in a sandboxed worker process (see code_executor.py) and formats the
+        structured result, which is kept in `last_execution`, as an observation.
+        """
+        executor = self.executor or get_code_executor()
+        execution = executor.execute(code)
+        self.last_execution = execution
+
+        if execution["status"] != "ok":
+            observation = f"Execution error: {execution['error']}"
+        elif execution["result"] is not None:
+            observation = execution["result"]
+        else:
+            observation = "Code executed successfully, but no 'result' was returned."
+        if execution["stdout"]:
+            observation = f"stdout:\n{execution['stdout']}\n{observation}"
+        return observation
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Token-budgeted conversation memory for SimpleCodeAgentWithMemory.
+
+The prompt of every agent step is the system prompt, a rolling summary of older turns
+and the most recent turns verbatim, compacted so that it stays within a token budget:
+
+- Messages above `max_message_tokens` (typically large observations) are truncated to
+  their head and tail, with a pointer to the full text stored as an artifact.
+- When the prompt exceeds the budget, the oldest turns beyond the `keep_recent_turns`
+  most recent ones are folded into the rolling summary.
+- The summary itself is capped at `max_summary_tokens`, dropping its oldest lines; a
+  single remaining line (e.g. a model-written paragraph) is cut to its most recent part.
+
+The full, uncompacted history stays available in `history`.
+"""
+import os
+import uuid
+
+from token_counter import count_tokens
+
+# Approximate per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def extractive_summarizer(previous_summary: str, turns: list) -> str:
+    """Default summarizer without a model call: keeps the first 200 characters of every folded turn."""
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        text = " ".join(turn["content"].split())
+        if len(text) > 200:
+            text = text[:200] + "..."
+        lines.append(f"- {turn['role']}: {text}")
+    return "\n".join(lines)
+
+
+def model_summarizer(model, max_tokens: int = 300):
+    """
+    Returns a summarizer that asks the agent's model to fold turns into the summary.
+    The model is called with OpenAI-style messages like in SimpleCodeAgentWithMemory.run.
+    """
+    def summarize(previous_summary: str, turns: list) -> str:
+        transcript = "\n\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        response = model([
+            {"role": "system", "content": f"Summarize the conversation so far in at most {max_tokens} tokens. "
+                                          "Keep facts, decisions, file names and results needed to continue the task."},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ])
+        return response["choices"][0]["message"]["content"].strip()
+    return summarize
+
+
+class TokenBudgetMemory:
+    def __init__(self, token_budget: int = 6000, keep_recent_turns: int = 6, max_message_tokens: int = 800,
+                 max_summary_tokens: int = 1000, summarizer=None, artifact_dir: str = None):
+        """
+        Args:
+        - token_budget (int): Maximum tokens of the prompt built by `build_context`.
+        - keep_recent_turns (int): Number of most recent turns that are never summarized.
+        - max_message_tokens (int): Messages above this size are truncated with an artifact pointer.
+        - max_summary_tokens (int): Maximum size of the rolling summary.
+        - summarizer: Callable (previous_summary, turns) -> summary; defaults to `extractive_summarizer`.
+        - artifact_dir (str): Directory for the full text of truncated messages; kept in memory if None.
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.max_message_tokens = max_message_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.summarizer = summarizer or extractive_summarizer
+        self.artifact_dir = artifact_dir
+        self.history = []  # Every message as it was added
+        self.turns = []    # Messages not yet folded into the summary, possibly truncated
+        self.summary = ""
+        self.artifacts = {}
+        self.last_context_tokens = 0
+
+    @staticmethod
+    def _tokens(message: dict) -> int:
+        return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    def add(self, role: str, content: str):
+        self.history.append({"role": role, "content": content})
+        self.turns.append({"role": role, "content": self._truncate(content)})
+
+    def _truncate(self, content: str) -> str:
+        tokens = count_tokens(content)
+        if tokens <= self.max_message_tokens:
+            return content
+        pointer = self._store_artifact(content)
+        # Keep head and tail in proportion to the character length, as an estimate of the token split
+        keep_chars = int(len(content) * self.max_message_tokens / tokens) // 2
+        return (
+            f"{content[:keep_chars]}\n"
+            f"[... {tokens - self.max_message_tokens} tokens truncated; full output: {pointer} ...]\n"
+            f"{content[-keep_chars:]}"
+        )
+
+    def _store_artifact(self, content: str) -> str:
+        artifact_id = uuid.uuid4().hex[:12]
+        if self.artifact_dir:
+            os.makedirs(self.artifact_dir, exist_ok=True)
+            path = os.path.join(self.artifact_dir, f"{artifact_id}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            return path
+        self.artifacts[artifact_id] = content
+        return f"artifact://{artifact_id}"
+
+    def get_artifact(self, pointer: str) -> str:
+        """Returns the full text behind a truncation pointer."""
+        if pointer.startswith("artifact://"):
+            return self.artifacts[pointer[len("artifact://"):]]
+        with open(pointer, "r", encoding="utf-8") as f:
+            return f.read()
+
+    @staticmethod
+    def _summary_message(summary: str) -> dict:
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+    def _context(self, system_prompt: str) -> list:
+        return ([{"role": "system", "content": system_prompt}]
+                + ([self._summary_message(self.summary)] if self.summary else [])
+                + self.turns)
+
+    def _compact(self, system_prompt: str):
+        """Folds the oldest turns into the summary until the prompt fits the budget."""
+        fixed_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        turn_tokens = [self._tokens(turn) for turn in self.turns]
+        summary_tokens = self._tokens(self._summary_message(self.summary)) if self.summary else 0
+        # Upper bound of the summary message after this compaction
+        max_summary_message_tokens = self._tokens(self._summary_message("")) + self.max_summary_tokens
+
+        fold = 0
+        foldable = max(0, len(self.turns) - self.keep_recent_turns)
+        while fold < foldable and fixed_tokens + summary_tokens + sum(turn_tokens[fold:]) > self.token_budget:
+            fold += 1
+        if fold == 0:
+            return
+
+        # Reserve room for the grown summary, then fold everything that is needed in one summarizer call
+        while fold < foldable and fixed_tokens + max_summary_message_tokens + sum(turn_tokens[fold:]) > self.token_budget:
+            fold += 1
+        self.summary = self._cap_summary(self.summarizer(self.summary, self.turns[:fold]))
+        self.turns = self.turns[fold:]
+
+    def _cap_summary(self, summary: str) -> str:
+        lines = summary.splitlines()
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.max_summary_tokens:
+            lines.pop(0)
+        summary = "\n".join(lines)
+        # Shrink a single oversized line from the front, in proportion to the character length
+        tokens = count_tokens(summary)
+        while summary and tokens > self.max_summary_tokens:
+            keep_chars = min(len(summary) - 1, int(len(summary) * self.max_summary_tokens / tokens))
+            summary = summary[len(summary) - keep_chars:] if keep_chars > 0 else ""
+            tokens = count_tokens(summary)
+        return summary
+
+    def build_context(self, system_prompt: str) -> list:
+        """
+        Returns the messages for the next model call, compacted to the token budget. The
+        budget can only be exceeded by the system prompt and the most recent turns.
+        """
+        self._compact(system_prompt)
+        context = self._context(system_prompt)
+        self.last_context_tokens = sum(self._tokens(message) for message in context)
+        return context
+
+    def clear(self):
+        self.history = []
+        self.turns = []
+        self.summary = ""
+        self.artifacts = {}
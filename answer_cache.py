@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Caches LLM answers keyed by the embedding of the question.
+
+    A lookup returns a cached answer when a previous question for the same namespace
+    (vectordb + model) is at least `similarity_threshold` cosine-similar to the new one.
+    Every entry remembers the version of the vectordb it was answered against, so
+    answers become invalid as soon as documents are added to or deleted from it.
+    Entries are bounded by a TTL and an LRU limit shared across all namespaces.
+    """
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, entry_id) -> entry dict, in LRU order
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_expired(self, entry, now) -> bool:
+        return self.ttl_seconds is not None and now - entry["created_at"] > self.ttl_seconds
+
+    def lookup(self, namespace, embedding, version: int, similarity_threshold: float = None):
+        """
+        Returns (answer, similarity) for the closest cached question, or None on a miss.
+
+        Args:
+        - namespace (hashable): Cache partition, e.g. (db_path, model).
+        - embedding (list): Embedding of the new question.
+        - version (int): Current version of the vectordb.
+        - similarity_threshold (float): Overrides the default threshold for this lookup.
+        """
+        threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        query = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            keys, vectors = [], []
+            for key, entry in list(self._entries.items()):
+                if key[0] != namespace:
+                    continue
+                if entry["version"] != version or self._is_expired(entry, now):
+                    del self._entries[key]
+                    continue
+                keys.append(key)
+                vectors.append(entry["embedding"])
+
+            if not vectors:
+                self.misses += 1
+                return None
+
+            similarities = np.stack(vectors) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return self._entries[keys[best]]["answer"], similarity
+
+    def store(self, namespace, question: str, embedding, answer: str, version: int):
+        """Adds an answer to the cache, evicting the least recently used entries if full."""
+        with self._lock:
+            key = (namespace, self._next_id)
+            self._next_id += 1
+            self._entries[key] = {
+                "question": question,
+                "embedding": self._normalize(embedding),
+                "answer": answer,
+                "version": version,
+                "created_at": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace=None):
+        """Drops all entries, or only those of one namespace."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Returns the process-wide answer cache, configured from the environment on first use."""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache(
+                similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+                ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+                max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+            )
+        return _answer_cache
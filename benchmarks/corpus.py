@@ -0,0 +1,106 @@
+"""
+Generator for synthetic wiki corpora: Markdown pages with nested sections, lists and
+code blocks, and Python modules with classes, methods and functions. The output only
+depends on the seed, so runs on different machines ingest identical files.
+
+    python benchmarks/corpus.py ./bench_corpus --markdown 500 --python 200
+"""
+import os
+import random
+import argparse
+
+_WORDS = (
+    "deployment pipeline cluster secret vault token rotation monitoring alert dashboard "
+    "database migration schema index replica backup restore release version branch merge "
+    "review terraform module variable output network subnet gateway firewall certificate "
+    "service endpoint request response latency throughput cache queue worker job retry "
+    "timeout config environment staging production incident runbook owner team api client"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng, rng.randint(6, 18)) for _ in range(rng.randint(2, 6)))
+
+
+def _identifier(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(_WORDS) for _ in range(parts))
+
+
+def markdown_page(rng: random.Random, sections: int) -> str:
+    lines = [f"# {_sentence(rng, 3)[:-1]}", "", _paragraph(rng), ""]
+    for _ in range(sections):
+        lines += [f"## {_sentence(rng, 3)[:-1]}", "", _paragraph(rng), ""]
+        for _ in range(rng.randint(0, 2)):
+            lines += [f"### {_sentence(rng, 2)[:-1]}", "", _paragraph(rng), ""]
+        if rng.random() < 0.4:
+            lines += [f"- {_sentence(rng, 5)}" for _ in range(rng.randint(2, 5))] + [""]
+        if rng.random() < 0.3:
+            lines += ["```bash", f"az {_identifier(rng)} --name {_identifier(rng)}", "```", ""]
+    return "\n".join(lines)
+
+
+def python_module(rng: random.Random, classes: int, functions: int) -> str:
+    lines = ['"""' + _sentence(rng, 8) + '"""', "import os", "import json", ""]
+    for _ in range(functions):
+        name = _identifier(rng)
+        lines += ["", f"def {name}({_identifier(rng, 1)}, {_identifier(rng, 1)}=None):",
+                  f'    """{_sentence(rng, 10)}"""',
+                  f"    result = {{'{rng.choice(_WORDS)}': {rng.randint(0, 100)}}}",
+                  f"    if {rng.choice(_WORDS)} is not None:",
+                  f"        result['{rng.choice(_WORDS)}'] = os.getenv('{rng.choice(_WORDS).upper()}')",
+                  "    return json.dumps(result)", ""]
+    for _ in range(classes):
+        lines += ["", f"class {''.join(word.title() for word in _identifier(rng).split('_'))}:",
+                  f'    """{_sentence(rng, 12)}"""',
+                  "    def __init__(self, config):",
+                  "        self.config = config", ""]
+        for _ in range(rng.randint(2, 6)):
+            lines += [f"    def {_identifier(rng)}(self, {_identifier(rng, 1)}):",
+                      f'        """{_sentence(rng, 10)}"""',
+                      f"        value = self.config.get('{rng.choice(_WORDS)}', {rng.randint(0, 10)})",
+                      f"        return value * {rng.randint(1, 9)}", ""]
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(directory: str, markdown_files: int = 200, python_files: int = 100, seed: int = 42) -> dict:
+    """
+    Writes the corpus below directory, spread over nested folders.
+
+    Returns:
+    - stats (dict): Number of files and bytes per file type.
+    """
+    rng = random.Random(seed)
+    stats = {"markdown_files": markdown_files, "python_files": python_files, "markdown_bytes": 0, "python_bytes": 0}
+    for i in range(markdown_files):
+        path = os.path.join(directory, "wiki", f"area_{i % 10}", f"topic_{i % 7}", f"page_{i}.md")
+        stats["markdown_bytes"] += _write(path, markdown_page(rng, sections=rng.randint(2, 8)))
+    for i in range(python_files):
+        path = os.path.join(directory, "src", f"package_{i % 5}", f"module_{i}.py")
+        stats["python_bytes"] += _write(path, python_module(rng, classes=rng.randint(0, 3), functions=rng.randint(1, 6)))
+    return stats
+
+
+def _write(path: str, text: str) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return len(text.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Markdown and Python corpus.")
+    parser.add_argument("directory")
+    parser.add_argument("--markdown", type=int, default=200, help="Number of Markdown pages.")
+    parser.add_argument("--python", type=int, default=100, help="Number of Python modules.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(generate_corpus(args.directory, args.markdown, args.python, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Cold-start benchmark: import time of the app modules and time to the first query
+result, each measured in a fresh interpreter with the offline fake embeddings.
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json   # exits with 1 on a regression
+
+Besides the import time, every module reports which heavy dependencies it pulled in,
+so a module-level import that defeats the lazy loading shows up even when the machine
+is too noisy to notice the extra time.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "shared_resources", "answer_cache", "reranker", "vector_store",
+    "llm_handler", "document_processor", "ingest_jobs", "service",
+]
+HEAVY_MODULES = ["langchain", "langchain_core", "langchain_community", "chromadb", "unstructured", "git", "openai"]
+
+_IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy_modules": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+_FIRST_QUERY_PROBE = """
+import json, sys, time
+process_start = time.perf_counter()
+sys.path.insert(0, {root!r})
+timings = {{}}
+from vector_store import VectorStoreManager
+from fake_backends import FakeChatModel, HashingEmbeddings
+from llm_handler import LLMHandler
+timings["import"] = time.perf_counter() - process_start
+vsm = VectorStoreManager(parent_dir={parent_dir!r}, embeddings=HashingEmbeddings())
+if {warm!r}:
+    from warmup import warmup
+    start = time.perf_counter()
+    warmup(vectorstore_manager=vsm, llm_handler=LLMHandler(model="fake", llm=FakeChatModel()))
+    timings["warmup"] = time.perf_counter() - start
+request_start = time.perf_counter()
+vectorstore = vsm.get_vectorstore("bench")
+timings["open"] = time.perf_counter() - request_start
+start = time.perf_counter()
+vectorstore.similarity_search("How do I configure the deployment pipeline?", k=8)
+timings["first_query"] = time.perf_counter() - start
+timings["first_request"] = time.perf_counter() - request_start
+start = time.perf_counter()
+vectorstore.similarity_search("Where are the secrets stored?", k=8)
+timings["second_query"] = time.perf_counter() - start
+timings["time_to_first_result"] = time.perf_counter() - process_start
+print(json.dumps(timings))
+"""
+
+
+def run_probe(code: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def interpreter_startup() -> float:
+    """Wall-clock time of an empty interpreter run, the floor below every probe."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def median_timings(samples: list) -> dict:
+    return {key: round(statistics.median(sample[key] for sample in samples), 4) for key in samples[0]}
+
+
+def build_vectordb(parent_dir: str, documents: int):
+    """Creates the 'bench' vectordb with synthetic chunks, embedded with the fake embeddings."""
+    sys.path.insert(0, REPO_ROOT)
+    from langchain_core.documents import Document
+    from fake_backends import HashingEmbeddings
+    from vector_store import VectorStoreManager
+
+    vsm = VectorStoreManager(parent_dir=parent_dir, embeddings=HashingEmbeddings())
+    vsm.create_vectordb("bench")
+    topics = ["deployment pipeline", "secrets", "monitoring", "database migration", "on-call rotation", "release notes"]
+    docs = [
+        Document(
+            page_content=f"Section {i} about the {topics[i % len(topics)]}: step {i % 17} configures service {i % 53}.",
+            metadata={"source": f"wiki/page_{i // 10}.md"},
+        )
+        for i in range(documents)
+    ]
+    vsm.add_documents("bench", docs, batch_size=500, delay=0)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a message per timing that is more than `tolerance` slower than the baseline."""
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], f"{path}{key}.")
+            elif isinstance(value, (int, float)) and previous[key] and value > previous[key] * (1 + tolerance):
+                regressions.append(f"{path}{key}: {previous[key]:.4f} s -> {value:.4f} s")
+            elif key == "heavy_modules" and set(value) - set(previous[key]):
+                regressions.append(f"{path}{key}: now also imports {sorted(set(value) - set(previous[key]))}")
+
+    walk(results, baseline, "")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to the first query in fresh processes.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement; the median is reported.")
+    parser.add_argument("--documents", type=int, default=2000, help="Chunks in the benchmark vectordb.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown relative to the baseline.")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "interpreter_seconds": round(statistics.median(interpreter_startup() for _ in range(args.repeat)), 4),
+        "imports": {},
+        "first_query": {},
+    }
+    for module in MODULES:
+        samples = [run_probe(_IMPORT_PROBE.format(root=REPO_ROOT, module=module, heavy=HEAVY_MODULES))
+                   for _ in range(args.repeat)]
+        results["imports"][module] = {
+            "seconds": round(statistics.median(sample["seconds"] for sample in samples), 4),
+            "heavy_modules": samples[0]["heavy_modules"],
+        }
+        print(f"import {module:<20} {results['imports'][module]['seconds']:.3f} s  {samples[0]['heavy_modules']}")
+
+    parent_dir = tempfile.mkdtemp(prefix="wiki-chat-startup-")
+    try:
+        build_vectordb(parent_dir, args.documents)
+        for mode, warm in (("cold", False), ("warm", True)):
+            samples = [run_probe(_FIRST_QUERY_PROBE.format(root=REPO_ROOT, parent_dir=parent_dir, warm=warm))
+                       for _ in range(args.repeat)]
+            results["first_query"][mode] = median_timings(samples)
+            print(f"first query ({mode}): {results['first_query'][mode]}")
+    finally:
+        shutil.rmtree(parent_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
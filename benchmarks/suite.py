@@ -0,0 +1,272 @@
+"""
+Offline end-to-end benchmark of the ingestion and query paths.
+
+Generates a synthetic corpus (see corpus.py) and runs the real code paths against the
+deterministic fake backends, so results do not depend on the network or on OpenAI:
+
+- scan:          DocumentProcessor.find_files
+- load_split:    DocumentProcessor.load_and_split_documents
+- python_chunks: get_python_chunks over the Python files alone
+- embed:         HashingEmbeddings.embed_documents over all chunks
+- write:         VectorStoreManager.add_documents (embedding, Chroma, journal, catalog)
+- retrieval:     similarity search latency (p50/p95/p99) at several collection sizes,
+                 plus rerank and answer assembly with the fake chat model
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --sizes 1000 10000 50000 --baseline results.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from corpus import generate_corpus, _WORDS  # noqa: E402
+
+
+def timed(func, quiet=True):
+    """Runs func and returns (result, seconds). The repo's progress prints are muted when quiet."""
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+
+def throughput(seconds: float, **counts) -> dict:
+    stage = {"seconds": round(seconds, 4)}
+    for name, count in counts.items():
+        stage[name] = count
+        stage[f"{name}_per_s"] = round(count / seconds, 2) if seconds else None
+    return stage
+
+
+def percentiles(latencies: list) -> dict:
+    """Nearest-rank percentiles in milliseconds."""
+    ordered = sorted(latencies)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        "queries": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(rank(50), 3),
+        "p95_ms": round(rank(95), 3),
+        "p99_ms": round(rank(99), 3),
+    }
+
+
+def bench_ingest(corpus_dir: str, vsm, args) -> tuple:
+    from document_processor import DocumentProcessor
+    from pyhton_chunker import get_python_chunks
+
+    processor = DocumentProcessor(vsm, llm=None)
+    file_types = ["md", "py"]
+    results = {}
+
+    files, seconds = timed(lambda: processor.find_files(corpus_dir, file_types), args.quiet)
+    results["scan"] = throughput(seconds, files=len(files))
+
+    total_bytes = sum(os.path.getsize(path) for path in files)
+    documents, seconds = timed(lambda: processor.load_and_split_documents(
+        None, file_types, args.splitter, args.chunk_size, args.chunk_overlap, file_paths=files
+    ), args.quiet)
+    results["load_split"] = throughput(seconds, files=len(files), chunks=len(documents), bytes=total_bytes)
+    failed = len(set(files) - {doc.metadata.get("source") for doc in documents})
+    results["load_split"]["files_failed"] = failed
+    if failed:
+        print(f"Warning: {failed} of {len(files)} files produced no chunks (run with --verbose to see why).")
+
+    python_files = [path for path in files if path.endswith(".py")]
+    chunk_count, seconds = timed(lambda: sum(len(get_python_chunks(path)) for path in python_files), args.quiet)
+    results["python_chunks"] = throughput(seconds, files=len(python_files), chunks=chunk_count)
+
+    texts = [doc.page_content for doc in documents]
+    _, seconds = timed(lambda: vsm.embeddings.embed_documents(texts), args.quiet)
+    results["embed"] = throughput(seconds, chunks=len(texts))
+
+    vsm.create_vectordb("ingest")
+    ok, seconds = timed(lambda: vsm.add_documents("ingest", documents, batch_size=args.batch_size, delay=0), args.quiet)
+    if not ok:
+        raise RuntimeError("add_documents failed; see the output above.")
+    results["write"] = throughput(seconds, chunks=len(documents))
+    return results, documents
+
+
+def grow_collection(vsm, db_name: str, documents: list, target: int, batch_size: int):
+    """Adds copies of the corpus chunks with fresh ids until the collection holds `target` chunks."""
+    from langchain_core.documents import Document
+
+    vectorstore = vsm.get_vectorstore(db_name)
+    missing = target - vectorstore._collection.count()
+    batch = []
+    for i in range(missing):
+        template = documents[i % len(documents)]
+        metadata = {key: value for key, value in template.metadata.items() if key != "id"}
+        batch.append(Document(page_content=template.page_content, metadata=metadata))
+    if batch and not vsm.add_documents(db_name, batch, batch_size=batch_size, delay=0):
+        raise RuntimeError(f"Failed to grow the collection to {target} chunks.")
+
+
+def bench_retrieval(vsm, documents: list, args) -> dict:
+    from fake_backends import FakeChatModel
+    from llm_handler import LLMHandler
+    from reranker import LexicalReranker
+
+    rng = random.Random(args.seed)
+    queries = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) for _ in range(args.queries)]
+    reranker = LexicalReranker()
+    llm_handler = LLMHandler(model="fake", llm=FakeChatModel(answer_tokens=32))
+
+    vsm.create_vectordb("retrieval")
+    results = {}
+    for size in sorted(args.sizes):
+        _, seconds = timed(lambda: grow_collection(vsm, "retrieval", documents, size, args.grow_batch_size), args.quiet)
+        vectorstore = vsm.get_vectorstore("retrieval")
+        # Warm up the collection so the first query does not include loading it
+        vectorstore.similarity_search(queries[0], k=args.k)
+
+        search, end_to_end, rerank, answer = [], [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            embedding = vsm.embeddings.embed_query(query)
+            search_start = time.perf_counter()
+            docs = vectorstore.similarity_search_by_vector(embedding, k=args.k)
+            search_end = time.perf_counter()
+            top_docs, _ = reranker.rerank(query, docs, top_m=args.top_m)
+            rerank_end = time.perf_counter()
+            llm_handler.answer(query, top_docs)
+            answer_end = time.perf_counter()
+            search.append(search_end - search_start)
+            end_to_end.append(search_end - start)
+            rerank.append(rerank_end - search_end)
+            answer.append(answer_end - rerank_end)
+
+        results[str(size)] = {
+            "grow_seconds": round(seconds, 4),
+            "search_by_vector": percentiles(search),
+            "embed_and_search": percentiles(end_to_end),
+            "rerank": percentiles(rerank),
+            "answer_fake_llm": percentiles(answer),
+        }
+        print(f"retrieval @ {size:>7} chunks: p50 {results[str(size)]['search_by_vector']['p50_ms']:.2f} ms, "
+              f"p99 {results[str(size)]['search_by_vector']['p99_ms']:.2f} ms")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a message per metric that regressed by more than `tolerance`: latencies
+    (`*_ms`) that grew and throughputs (`*_per_s`) that shrank.
+    """
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous or previous[key] in (None, 0):
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], f"{path}{key}.")
+            elif key.endswith("_ms") and value > previous[key] * (1 + tolerance):
+                regressions.append(f"{path}{key}: {previous[key]} -> {value}")
+            elif key.endswith("_per_s") and value is not None and value < previous[key] / (1 + tolerance):
+                regressions.append(f"{path}{key}: {previous[key]} -> {value}")
+
+    walk({"ingest": results["ingest"], "retrieval": results["retrieval"]}, baseline, "")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of ingestion throughput and retrieval latency.")
+    parser.add_argument("--markdown", type=int, default=200, help="Markdown pages in the corpus.")
+    parser.add_argument("--python", type=int, default=100, help="Python modules in the corpus.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus", help="Use an existing corpus directory instead of generating one.")
+    parser.add_argument("--splitter", default="Recursive", choices=["Recursive", "Markdown"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64, help="Batch size of add_documents during ingestion.")
+    parser.add_argument("--dimensions", type=int, default=256, help="Dimensions of the fake embeddings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="Collection sizes for retrieval.")
+    parser.add_argument("--grow-batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per collection size.")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--top-m", type=int, default=8)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression relative to the baseline.")
+    parser.add_argument("--verbose", dest="quiet", action="store_false", help="Show the progress output of the repo code.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary corpus and vectordbs.")
+    args = parser.parse_args()
+
+    from fake_backends import HashingEmbeddings
+    from vector_store import VectorStoreManager
+
+    work_dir = tempfile.mkdtemp(prefix="wiki-chat-bench-")
+    try:
+        corpus_dir = args.corpus
+        corpus_stats = None
+        if not corpus_dir:
+            corpus_dir = os.path.join(work_dir, "corpus")
+            corpus_stats = generate_corpus(corpus_dir, args.markdown, args.python, args.seed)
+        vsm = VectorStoreManager(parent_dir=os.path.join(work_dir, "vectordbs"), embeddings=HashingEmbeddings(args.dimensions))
+
+        ingest, documents = bench_ingest(corpus_dir, vsm, args)
+        for stage, values in ingest.items():
+            rates = ", ".join(f"{key} {value}" for key, value in values.items() if key.endswith("_per_s"))
+            print(f"{stage:<14} {values['seconds']:>8.3f} s  {rates}")
+        if not documents:
+            raise RuntimeError("The corpus produced no chunks.")
+        retrieval = bench_retrieval(vsm, documents, args)
+    finally:
+        if args.keep:
+            print(f"Kept {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        },
+        "corpus": corpus_stats,
+        "ingest": ingest,
+        "retrieval": retrieval,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
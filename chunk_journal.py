@@ -0,0 +1,224 @@
+"""
+Compressed, append-only journal of the chunks stored in a vectordb.
+
+Every batch written by VectorStoreManager.add_documents is appended as JSON lines
+(id, source, metadata, text, content hash) to <db>/chunks.jsonl.gz, and deletions are
+appended as tombstones. Replaying the journal yields the live chunks without
+re-parsing any source file, e.g. to re-embed them with a different model:
+
+    python chunk_journal.py --from wiki --to wiki-large --embedding-model text-embedding-3-large
+"""
+import os
+import json
+import gzip
+import time
+import zlib
+import hashlib
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = "chunks.jsonl.gz"
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+_READ_BLOCK = 1 << 20
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkJournal:
+    """
+    Append-only gzip JSONL journal. Each append writes a new gzip member, so writes
+    are streamed batch by batch and never rewrite existing data. Every append is
+    fsynced, and the reader verifies member by member: a member torn by a crash
+    mid-append is skipped with a warning instead of making the whole journal unreadable.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = _lock_for(path)
+
+    def _append(self, records: list):
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        member = gzip.compress(lines.encode("utf-8"), compresslevel=6)
+        with self._lock, open(self.path, "ab") as f:
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append_chunks(self, documents: list):
+        """Appends chunk records; every document must carry its vectorstore id in metadata['id']."""
+        now = time.time()
+        self._append([
+            {
+                "op": "add",
+                "id": doc.metadata["id"],
+                "source": doc.metadata.get("source"),
+                "metadata": doc.metadata,
+                "text": doc.page_content,
+                "hash": content_hash(doc.page_content),
+                "ts": now,
+            }
+            for doc in documents
+        ])
+
+    def append_deletes(self, ids: list = None, sources: list = None):
+        """Appends tombstones for deleted chunk ids and/or for all chunks of deleted sources."""
+        now = time.time()
+        records = []
+        if ids:
+            records.append({"op": "delete", "ids": list(ids), "ts": now})
+        if sources:
+            records.append({"op": "delete_source", "sources": list(sources), "ts": now})
+        self._append(records)
+
+    def iter_records(self):
+        for text in self._iter_members():
+            for line in text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+    def _iter_members(self):
+        """
+        Yields the text of every intact gzip member. A torn or corrupt member (e.g. from a
+        crash during an append) is skipped up to the next member header; its records are
+        lost, but the records before and after it stay readable.
+        """
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            offset = 0
+            while offset < size:
+                f.seek(offset)
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                parts, consumed, complete = [], 0, False
+                try:
+                    while not complete:
+                        block = f.read(_READ_BLOCK)
+                        if not block:
+                            break
+                        parts.append(decompressor.decompress(block))
+                        if decompressor.eof:
+                            consumed += len(block) - len(decompressor.unused_data)
+                            complete = True
+                        else:
+                            consumed += len(block)
+                    text = b"".join(parts).decode("utf-8") if complete else None
+                except (zlib.error, UnicodeDecodeError):
+                    text = None
+                if text is not None:
+                    yield text
+                    offset += consumed
+                    continue
+
+                next_offset = self._find_member(f, offset + 1)
+                if next_offset is None:
+                    logger.warning(f"Journal {self.path}: ignoring a torn record batch at byte {offset} (end of file).")
+                    return
+                logger.warning(f"Journal {self.path}: skipping a corrupt record batch at bytes {offset}-{next_offset}.")
+                offset = next_offset
+
+    @staticmethod
+    def _find_member(f, start: int):
+        """Returns the offset of the next gzip member header at or after start, or None."""
+        f.seek(start)
+        position = start
+        tail = b""
+        while True:
+            block = f.read(_READ_BLOCK)
+            if not block:
+                return None
+            data = tail + block
+            index = data.find(_GZIP_MAGIC)
+            if index >= 0:
+                return position - len(tail) + index
+            tail = data[-(len(_GZIP_MAGIC) - 1):]
+            position += len(block)
+
+    def iter_live_chunks(self):
+        """
+        Yields the 'add' records of all chunks that are still live, in journal order.
+        Two passes keep memory at one integer per chunk id instead of holding all texts.
+        """
+        last_add, deleted_at, source_deleted_at = {}, {}, {}
+        for seq, record in enumerate(self.iter_records()):
+            op = record["op"]
+            if op == "add":
+                last_add[record["id"]] = seq
+            elif op == "delete":
+                for chunk_id in record["ids"]:
+                    deleted_at[chunk_id] = seq
+            elif op == "delete_source":
+                for source in record["sources"]:
+                    source_deleted_at[source] = seq
+
+        for seq, record in enumerate(self.iter_records()):
+            if record["op"] != "add" or last_add.get(record["id"]) != seq:
+                continue
+            if deleted_at.get(record["id"], -1) > seq or source_deleted_at.get(record["source"], -1) > seq:
+                continue
+            yield record
+
+    def compact(self) -> int:
+        """Rewrites the journal with only the live chunks and returns their number."""
+        tmp_path = self.path + ".compact"
+        count = 0
+        with self._lock:
+            with open(tmp_path, "wb") as raw:
+                with gzip.open(raw, "wt", encoding="utf-8") as f:
+                    for record in self.iter_live_chunks():
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        count += 1
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, self.path)
+        return count
+
+    def reset(self):
+        """Removes the journal, e.g. when its vectordb is rebuilt from another one."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or re-embed a vectordb from its chunk journal.")
+    parser.add_argument("--parent-dir", default="./chroma_db", help="Parent directory of the vectordbs.")
+    parser.add_argument("--from", dest="source_db", required=True, help="Vectordb whose journal is replayed.")
+    parser.add_argument("--to", dest="target_db", help="Vectordb to rebuild into (created if missing).")
+    parser.add_argument("--embedding-model", help="OpenAI embedding model for the target vectordb.")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--compact", action="store_true", help="Drop deleted chunks from the source journal.")
+    args = parser.parse_args()
+
+    from vector_store import VectorStoreManager
+
+    source_manager = VectorStoreManager(parent_dir=args.parent_dir)
+    journal = source_manager.get_journal(args.source_db)
+    if args.compact:
+        print(f"Compacted journal of '{args.source_db}' to {journal.compact()} live chunks.")
+    if args.target_db:
+        # The model is stored with the target vectordb, so the UI and the service query it with the same model
+        if not source_manager.create_vectordb(args.target_db, embedding_model=args.embedding_model):
+            if source_manager.get_embedding_model(args.target_db) != args.embedding_model:
+                parser.error(f"Vectordb '{args.target_db}' already exists with embedding model "
+                             f"'{source_manager.get_embedding_model(args.target_db) or 'default'}'.")
+        count = source_manager.rebuild_from_journal(args.target_db, journal.path, batch_size=args.batch_size)
+        print(f"Rebuilt '{args.target_db}' with {count} chunks from the journal of '{args.source_db}'.")
+
+
+if __name__ == "__main__":
+    main()
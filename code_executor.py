@@ -0,0 +1,209 @@
+"""
+Pooled subprocess executor for model-generated code.
+
+Code runs in pre-started worker processes instead of the server process. Each call has
+a wall-clock timeout, each worker an address-space limit (RLIMIT_AS, POSIX only), and
+workers are reused across calls so the process start-up cost is only paid once. A
+worker that times out, crashes or runs out of memory is killed and replaced, and every
+worker is recycled after `max_tasks_per_worker` calls so leaked state cannot pile up.
+
+This isolates the server from runaway or crashing code; it is not a security boundary
+against hostile code (the workers can still read files and open sockets).
+"""
+import io
+import os
+import time
+import queue
+import atexit
+import threading
+import contextlib
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Environment variables that are not passed on to generated code
+_SECRET_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CREDENTIAL")
+
+
+def _worker_main(conn, memory_limit_mb: int, max_output_chars: int):
+    """Loop of a worker process: receives code, executes it and sends back a result dict."""
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    for name in list(os.environ):
+        if any(marker in name.upper() for marker in _SECRET_MARKERS):
+            del os.environ[name]
+
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if code is None:
+            return
+
+        stdout = io.StringIO()
+        namespace = {"__name__": "__sandbox__"}
+        start = time.perf_counter()
+        status, result, error = "ok", None, None
+        try:
+            with contextlib.redirect_stdout(stdout):
+                exec(code, namespace)
+            if "result" in namespace:
+                value = namespace["result"]
+                result = value if isinstance(value, str) else repr(value)
+        except MemoryError:
+            status, error = "memory", f"Memory limit of {memory_limit_mb} MB exceeded."
+        except BaseException as e:  # SystemExit and KeyboardInterrupt from generated code, too
+            status, error = "error", f"{type(e).__name__}: {e}"
+
+        try:
+            conn.send({
+                "status": status,
+                "result": result[:max_output_chars] if result is not None else None,
+                "stdout": stdout.getvalue()[:max_output_chars],
+                "error": error,
+                "duration": time.perf_counter() - start,
+            })
+        except MemoryError:
+            conn.send({"status": "memory", "result": None, "stdout": "",
+                       "error": f"Memory limit of {memory_limit_mb} MB exceeded.", "duration": time.perf_counter() - start})
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb: int, max_output_chars: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb, max_output_chars), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+
+
+class SandboxedExecutor:
+    """
+    Thread-safe pool of worker processes. `execute` blocks until a worker is free, so up
+    to `workers` calls from different threads (agents, sessions) run in parallel on
+    separate cores.
+    """
+    def __init__(self, workers: int = None, timeout_seconds: float = 10.0, memory_limit_mb: int = 512,
+                 max_tasks_per_worker: int = 100, max_output_chars: int = 20000):
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_output_chars = max_output_chars
+        # forkserver forks workers from a clean helper process instead of the (multi-threaded) server
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._context.set_forkserver_preload([__name__])
+        self._idle = queue.Queue()
+        self._all = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"executions": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.memory_limit_mb, self.max_output_chars)
+        with self._lock:
+            self._all.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker):
+        worker.kill()
+        with self._lock:
+            self._all.discard(worker)
+            self.stats["recycled"] += 1
+
+    def execute(self, code: str, timeout_seconds: float = None) -> dict:
+        """
+        Executes code in a worker process. The code returns a value by assigning `result`.
+
+        Returns:
+        - result (dict): status ("ok", "error", "timeout", "memory" or "crashed"), result
+          (str or None), stdout (str), error (str or None), duration (seconds).
+        """
+        if self._closed:
+            raise RuntimeError("The executor has been shut down.")
+        timeout_seconds = timeout_seconds or self.timeout_seconds
+        worker = self._idle.get()
+        start = time.perf_counter()
+        recycle = False
+        try:
+            worker.conn.send(code)
+            worker.tasks += 1
+            if worker.conn.poll(timeout_seconds):
+                result = worker.conn.recv()
+                recycle = result["status"] == "memory"
+            else:
+                recycle = True
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                result = {"status": "timeout", "result": None, "stdout": "",
+                          "error": f"Execution timed out after {timeout_seconds:g} s.", "duration": timeout_seconds}
+        except (EOFError, OSError) as e:
+            # The worker died, e.g. killed by the OS or by a hard crash in C code
+            recycle = True
+            with self._lock:
+                self.stats["crashes"] += 1
+            worker.process.join(timeout=1)
+            result = {"status": "crashed", "result": None, "stdout": "",
+                      "error": f"Worker process crashed ({type(e).__name__}, exit code {worker.process.exitcode}).",
+                      "duration": time.perf_counter() - start}
+        finally:
+            with self._lock:
+                self.stats["executions"] += 1
+            if recycle or worker.tasks >= self.max_tasks_per_worker or not worker.process.is_alive():
+                self._retire(worker)
+                worker = None if self._closed else self._spawn()
+            if worker is not None:
+                self._idle.put(worker)
+        return result
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._all)
+            self._all.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.kill()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_code_executor() -> SandboxedExecutor:
+    """Returns the process-wide executor, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = os.getenv("CODE_EXECUTOR_WORKERS")
+            _executor = SandboxedExecutor(
+                workers=int(workers) if workers else None,
+                timeout_seconds=float(os.getenv("CODE_EXECUTOR_TIMEOUT_SECONDS", "10")),
+                memory_limit_mb=int(os.getenv("CODE_EXECUTOR_MEMORY_MB", "512")),
+                max_tasks_per_worker=int(os.getenv("CODE_EXECUTOR_MAX_TASKS_PER_WORKER", "100")),
+            )
+            atexit.register(_executor.shutdown)
+        return _executor
@@ -1,25 +1,73 @@
 import os
 import glob
+import re
 import json
+import time
 import uuid  # Moved import to the top for better practice
+import logging
+from typing import TYPE_CHECKING
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from vector_store import VectorStoreManager
 from llm_handler import LLMHandler
 from pyhton_chunker import get_python_chunks
-from langchain.schema import Document
+from tracing import get_tracer
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Documents, loaders, text splitters and GitPython are imported where they are used, so
+# importing this module (e.g. for the job queue of the query service) stays cheap.
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+def split_markdown_sections(text: str) -> list:
+    """
+    Splits Markdown into (heading path, section text) pairs at every heading outside of
+    code fences. The heading path joins the enclosing headings, e.g. "Setup > Azure".
+    """
+    sections = []
+    current_lines = []
+    heading_path = []
+    current_heading = ""
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        match = None if in_fence else _MARKDOWN_HEADING.match(line.rstrip("\r\n"))
+        if match:
+            if "".join(current_lines).strip():
+                sections.append((current_heading, "".join(current_lines)))
+            level = len(match.group(1))
+            heading_path = heading_path[:level - 1] + [match.group(2)]
+            current_heading = " > ".join(heading_path)
+            current_lines = [line]
+        else:
+            current_lines.append(line)
+    if "".join(current_lines).strip():
+        sections.append((current_heading, "".join(current_lines)))
+    return sections
 
-# Add the missing imports below
-from langchain_community.document_loaders import UnstructuredMarkdownLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter, MarkdownTextSplitter
 
 class DocumentProcessor:
     """
     The DocumentProcessor class takes documents of any kind and processes 
     them so that they can be stored in a vector store.
     """
-    def __init__(self, vectorstore_manager: VectorStoreManager, llm: LLMHandler):
+    def __init__(self, vectorstore_manager: VectorStoreManager, llm: LLMHandler, parent_chunk_size: int = None):
+        """
+        Args:
+        - vectorstore_manager (VectorStoreManager): Where the chunks are stored.
+        - llm (LLMHandler): Used for summaries and the table of contents.
+        - parent_chunk_size (int): Enables parent-document mode. Files are split into parent
+          sections of at most this size (Markdown sections, Python classes), which are split
+          into small child chunks. Only the children are embedded.
+        """
         self.vectorstore_manager = vectorstore_manager
         self.llm = llm
+        self.parent_chunk_size = parent_chunk_size
 
     def process_documents(self, db_name: str, directory: str, file_types: list, splitter_type="Recursive", chunk_size=2000, chunk_overlap=200, progress_callback=None):
         """
@@ -50,7 +98,7 @@ class DocumentProcessor:
             files.extend(glob.glob(os.path.join(directory, f"**/*.{file_type}"), recursive=True))
 
         if not files:
-            print("No files found matching the specified file types.")
+            logger.warning("No files found matching the specified file types.")
             return
 
         # Add summaries of the files to the vector store
@@ -70,20 +118,134 @@ class DocumentProcessor:
                 for doc in documents
             ]
             
-            # Add documents to the vector store
+            # Add documents to the vector store; they are also appended to the vectordb's chunk journal
             success = self.vectorstore_manager.add_documents(db_name, documents=documents)
             if success:
-                print("Documents added successfully to the vector store.")
+                logger.info("Documents added successfully to the vector store.")
             else:
-                print("Failed to add documents to the vector store.")
-            
-            # Optionally, write documents to a file for record-keeping
-            filename = db_name + "_documents.txt" if db_name else "documents.txt"
-            with open(db_name, "w", encoding='utf-8') as f:
-                for doc in documents:
-                    f.write(f"{doc.metadata.get('source', 'Unknown Source')} - Chunk {doc.metadata.get('chunk', 'N/A')}\n{doc.page_content}\n\n")
+                logger.error("Failed to add documents to the vector store.")
+        else:
+            logger.info("No documents to add to the vector store.")
+
+    def sync_git_repository(self, db_name: str, repo_path: str, file_types: list, splitter_type="Recursive", chunk_size=2000, chunk_overlap=200, batch_size=5, delay=1.0, progress_callback=None):
+        """
+        Incrementally syncs a Git repository (e.g. a wiki) into the vector store.
+
+        The last ingested commit is recorded per vectordb and repository. On the next sync
+        only files that were added, modified, renamed or deleted between that commit and
+        HEAD are touched: their old chunks are deleted and the current files are loaded,
+        split and embedded. The first sync ingests all tracked files. Files are read from
+        the working tree, which is expected to be checked out at HEAD (e.g. after a pull).
+
+        Args:
+        - db_name (str): The name of the vectordb to sync into.
+        - repo_path (str): Path to the working tree of the repository.
+        - file_types (list): The list of file types to be supported.
+        - splitter_type (str): The type of text splitter to use.
+        - chunk_size (int): The size of the text chunks.
+        - chunk_overlap (int): The overlap between text chunks.
+
+        Returns:
+        - summary (dict): The synced commit range, the number of changed files and chunks, and the
+          files that could not be loaded with their errors.
+        """
+        from git import Repo
+        repo = Repo(repo_path)
+        head = repo.head.commit
+        repo_key = os.path.abspath(repo_path)
+        state = self._load_sync_state(db_name)
+        last_commit = state.get(repo_key, {}).get("commit")
+
+        extensions = tuple(f".{file_type.lower()}" for file_type in file_types)
+
+        def to_source(relative_path):
+            return os.path.join(repo_path, *relative_path.split("/"))
+
+        to_delete, to_load = set(), set()
+        counts = {"added": 0, "modified": 0, "renamed": 0, "deleted": 0}
+
+        if last_commit is None:
+            mode = "full"
+            # NUL-separated, so paths with non-ASCII characters are not quoted and octal-escaped
+            tracked = [path for path in repo.git.ls_files("-z").split("\0") if path.lower().endswith(extensions)]
+            # Remove chunks of an earlier directory-based ingestion of the same files
+            to_delete.update(to_source(path) for path in tracked)
+            to_load.update(to_source(path) for path in tracked)
+            counts["added"] = len(tracked)
+        elif last_commit == head.hexsha:
+            mode = "up-to-date"
         else:
-            print("No documents to add to the vector store.")
+            mode = "incremental"
+            for diff in repo.commit(last_commit).diff(head):
+                old_path = diff.a_path if diff.a_path and diff.a_path.lower().endswith(extensions) else None
+                new_path = diff.b_path if diff.b_path and diff.b_path.lower().endswith(extensions) else None
+                if diff.change_type == "D":
+                    new_path = None
+                    counts["deleted"] += bool(old_path)
+                elif diff.change_type in ("A", "C"):
+                    old_path = None
+                    counts["added"] += bool(new_path)
+                elif diff.change_type == "R":
+                    counts["renamed"] += bool(old_path or new_path)
+                else:
+                    counts["modified"] += bool(new_path)
+                if old_path:
+                    to_delete.add(to_source(old_path))
+                if new_path:
+                    to_load.add(to_source(new_path))
+
+        # Every file to load is deleted by source first, so a sync that was interrupted after
+        # loading some files can be rerun from the same diff without duplicating their chunks
+        to_delete = sorted(to_delete | to_load)
+        for i in range(0, len(to_delete), 500):
+            if not self.vectorstore_manager.delete_documents_by_source(db_name, to_delete[i:i + 500]):
+                raise RuntimeError(f"Failed to delete outdated chunks from vectordb '{db_name}'.")
+
+        text_splitter = self.get_text_splitter(splitter_type, chunk_size, chunk_overlap)
+        chunks_added = 0
+        failed_files = {}
+        to_load = sorted(to_load)
+        for idx, file_path in enumerate(to_load):
+            try:
+                documents = self.load_file(file_path, text_splitter)
+            except Exception as e:
+                logger.exception(f"Error processing file {file_path}")
+                failed_files[file_path] = str(e)
+                documents = []
+            if documents and not self.vectorstore_manager.add_documents(db_name, documents, batch_size=batch_size, delay=delay):
+                raise RuntimeError(f"Failed to add the chunks of {file_path} to vectordb '{db_name}'.")
+            chunks_added += len(documents)
+            if progress_callback:
+                progress_callback(idx + 1, len(to_load), file_path)
+
+        state[repo_key] = {"commit": head.hexsha, "synced_at": time.time()}
+        self._save_sync_state(db_name, state)
+
+        return {
+            "mode": mode,
+            "from_commit": last_commit,
+            "to_commit": head.hexsha,
+            **counts,
+            "files_loaded": len(to_load),
+            "chunks_added": chunks_added,
+            "failed_files": failed_files,
+        }
+
+    def _sync_state_path(self, db_name: str) -> str:
+        return os.path.join(self.vectorstore_manager.get_db_path(db_name), "git_sync.json")
+
+    def _load_sync_state(self, db_name: str) -> dict:
+        path = self._sync_state_path(db_name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_sync_state(self, db_name: str, state: dict):
+        path = self._sync_state_path(db_name)
+        with open(path + ".tmp", "w", encoding='utf-8') as f:
+            json.dump(state, f, indent=4)
+        os.replace(path + ".tmp", path)
 
     def add_file_summaries(self, files, read_from_file=False, db_name: str = "", progress_callback=None):
         """
@@ -118,7 +280,7 @@ class DocumentProcessor:
                             "file_name": os.path.basename(file)
                         }
                 except Exception as e:
-                    print(f"Error reading file {file}: {e}")
+                    logger.error(f"Error reading file {file}: {e}")
                     return file, None
 
             total_files = len(files)
@@ -174,7 +336,7 @@ class DocumentProcessor:
         for summary in summaries.values():
             combined_summaries += f"FILE: {summary['file_name']}\nSUMMARY: {summary['summary']}\n\n"
 
-        print(combined_summaries)
+        logger.debug(f"Combined {len(summaries)} file summaries ({len(combined_summaries)} characters).")
 
         return combined_summaries
 
@@ -204,12 +366,22 @@ class DocumentProcessor:
             })
         ])            
 
-    def load_and_split_documents(self, directory, file_types, splitter_type, chunk_size, chunk_overlap, progress_callback=None):
+    def find_files(self, directory, file_types):
+        """
+        Returns the paths of all files below directory matching one of the file types.
+        """
         all_file_paths = []
         for file_type in file_types:
             file_pattern = os.path.join(directory, f"**/*.{file_type}")
             matched = glob.glob(file_pattern, recursive=True)
             all_file_paths.extend(matched)
+        return all_file_paths
+
+    def load_and_split_documents(self, directory, file_types, splitter_type, chunk_size, chunk_overlap, progress_callback=None, file_paths=None):
+        """
+        Loads and splits all matching files below directory, or only the given file_paths.
+        """
+        all_file_paths = self.find_files(directory, file_types) if file_paths is None else list(file_paths)
 
         # Standard-Splitter, falls wir später für große Python-Blöcke ebenfalls Chunking wollen
         text_splitter = self.get_text_splitter(splitter_type, chunk_size, chunk_overlap)
@@ -219,46 +391,173 @@ class DocumentProcessor:
         for idx, file_path in enumerate(all_file_paths):
 
             try:
-                ext = os.path.splitext(file_path)[1].lower()
-
-                if ext == ".py":
-                    # 1) Python-spezifisches Chunking via AST
-                    python_chunks = get_python_chunks(file_path)
-                    print(f"Processing Python file {file_path} with {len(python_chunks)} chunks.")
-                    for i, chunk in enumerate(python_chunks):
-                        doc = Document(
-                            page_content=chunk["source"],
-                            metadata={
-                                "source": chunk["file_path"],
-                                "chunk": i,
-                                "python_chunk_type": chunk["type"],
-                                "python_chunk_name": chunk["name"],
-                                "start_line": chunk["start_line"],
-                                "end_line": chunk["end_line"],
-                                "chunk_type": "python",
-                                "id": self.generate_doc_id()
-                            }
-                        )
-                        documents.append(doc)
-                else:
-                    # 2) Standard-Loader für Nicht-Python-Dateien
-                    loader = self.get_loader(file_path)
-                    file_docs = loader.load()
-                    split_docs = text_splitter.split_documents(file_docs)
-                    for i, doc in enumerate(split_docs):
-                        doc.metadata["source"] = file_path
-                        doc.metadata["chunk"] = i
-                        doc.metadata["id"] = self.generate_doc_id()
-                        documents.append(doc)
+                documents.extend(self.load_file(file_path, text_splitter))
                 # Invoke the progress callback with the current state
                 if progress_callback:
                     progress_callback(idx, len_total_files, file_path)
             except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
+                logger.error(f"Error processing file {file_path}: {e}")
+
+        return documents
 
+    def load_file(self, file_path, text_splitter):
+        """
+        Loads a single file and splits it into chunk documents.
+        Python files are chunked via AST, Markdown files per heading section and then,
+        like all other files, with the given text splitter.
+        The stages are traced as "load" and "split" spans with byte and chunk counts.
+        """
+        from langchain_core.documents import Document
+        tracer = get_tracer()
+        ext = os.path.splitext(file_path)[1].lower()
+        file_bytes = os.path.getsize(file_path)
+        tracer.count("ingest_bytes", file_bytes, file_type=ext)
+
+        if self.parent_chunk_size:
+            with tracer.span("split", chunker="parents", file_type=ext, bytes=file_bytes) as span:
+                documents = self.load_file_with_parents(file_path, text_splitter)
+                span.set(chunks=len(documents))
+        elif ext == ".py":
+            # 1) Python-spezifisches Chunking via AST (reads and parses the file in one pass)
+            with tracer.span("split", chunker="python_ast", file_type=ext, bytes=file_bytes) as span:
+                documents = [doc for doc, _ in self.load_python_file(file_path)]
+                span.set(chunks=len(documents))
+        elif ext == ".md":
+            # Markdown is split per heading section, so every chunk keeps its heading path
+            # in metadata['section'] (used e.g. by the reranker's heading boost)
+            with tracer.span("load", file_type=ext, bytes=file_bytes):
+                with open(file_path, "r", encoding="utf-8") as f:
+                    sections = split_markdown_sections(f.read())
+            with tracer.span("split", chunker=type(text_splitter).__name__, file_type=ext, bytes=file_bytes) as span:
+                documents = []
+                for section, text in sections:
+                    for chunk_text in text_splitter.split_text(text):
+                        documents.append(Document(page_content=chunk_text, metadata={
+                            "source": file_path,
+                            "chunk": len(documents),
+                            "id": self.generate_doc_id(),
+                            "section": section,
+                        }))
+                span.set(chunks=len(documents))
+        else:
+            # 2) Standard-Loader für Nicht-Python-Dateien
+            with tracer.span("load", file_type=ext, bytes=file_bytes):
+                file_docs = self.get_loader(file_path).load()
+            with tracer.span("split", chunker=type(text_splitter).__name__, file_type=ext, bytes=file_bytes) as span:
+                documents = text_splitter.split_documents(file_docs)
+                for i, doc in enumerate(documents):
+                    doc.metadata["source"] = file_path
+                    doc.metadata["chunk"] = i
+                    doc.metadata["id"] = self.generate_doc_id()
+                span.set(chunks=len(documents))
+
+        tracer.count("ingest_chunks", len(documents), file_type=ext)
         return documents
 
 
+    def load_file_with_parents(self, file_path, child_splitter):
+        """
+        Parent-document mode: returns parent sections (metadata 'is_parent') followed by
+        their child chunks (metadata 'parent_id'). VectorStoreManager.add_documents stores
+        the parents in the vectordb's parent store and embeds only the children.
+        - Markdown: one parent per heading section.
+        - Python: one parent per class; its methods are the children. Top-level functions
+          and module code stay standalone chunks.
+        - Other files: fixed-size parent windows.
+        Parents larger than parent_chunk_size are split further.
+        """
+        from langchain_core.documents import Document
+        ext = os.path.splitext(file_path)[1].lower()
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        parent_splitter = RecursiveCharacterTextSplitter(chunk_size=self.parent_chunk_size, chunk_overlap=0)
+        parents, children = [], []
+
+        def add_parent(text, section, extra_metadata=None):
+            for part in parent_splitter.split_text(text) if len(text) > self.parent_chunk_size else [text]:
+                parent = Document(page_content=part, metadata={
+                    "source": file_path,
+                    "id": self.generate_doc_id(),
+                    "is_parent": True,
+                    "chunk_type": "parent",
+                    "section": section,
+                    **(extra_metadata or {})
+                })
+                parents.append(parent)
+                yield parent
+
+        if ext == ".py":
+            with open(file_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            class_parents = {}
+            python_docs = self.load_python_file(file_path)
+            for doc, chunk in python_docs:
+                class_name = chunk.get("class_name")
+                if class_name and class_name not in class_parents:
+                    class_text = "\n".join(lines[chunk["class_start_line"]:chunk["class_end_line"]])
+                    # Classes larger than a parent keep their methods as standalone chunks
+                    class_parents[class_name] = None
+                    if len(class_text) <= self.parent_chunk_size:
+                        class_parents[class_name] = next(add_parent(class_text, class_name, {
+                            "python_chunk_type": "class",
+                            "python_chunk_name": class_name,
+                            "start_line": chunk["class_start_line"],
+                            "end_line": chunk["class_end_line"],
+                        }))
+                if class_name and class_parents[class_name] is not None:
+                    doc.metadata["parent_id"] = class_parents[class_name].metadata["id"]
+                    doc.metadata["section"] = class_name
+                children.append(doc)
+            return parents + children
+
+        if ext == ".md":
+            with open(file_path, "r", encoding="utf-8") as f:
+                sections = split_markdown_sections(f.read())
+        else:
+            file_docs = self.get_loader(file_path).load()
+            sections = [("", doc.page_content) for doc in file_docs]
+
+        for section, text in sections:
+            for parent in add_parent(text, section):
+                for i, child_text in enumerate(child_splitter.split_text(parent.page_content)):
+                    children.append(Document(page_content=child_text, metadata={
+                        "source": file_path,
+                        "chunk": len(children),
+                        "id": self.generate_doc_id(),
+                        "parent_id": parent.metadata["id"],
+                        "section": section,
+                    }))
+        return parents + children
+
+    def load_python_file(self, file_path):
+        """
+        Chunks a Python file via AST. Returns (document, raw chunk) pairs.
+        """
+        from langchain_core.documents import Document
+        python_chunks = get_python_chunks(file_path)
+        logger.debug(f"Processing Python file {file_path} with {len(python_chunks)} chunks.")
+        result = []
+        for i, chunk in enumerate(python_chunks):
+            doc = Document(
+                page_content=chunk["source"],
+                metadata={
+                    "source": chunk["file_path"],
+                    "chunk": i,
+                    "python_chunk_type": chunk["type"],
+                    "python_chunk_name": chunk["name"],
+                    "start_line": chunk["start_line"],
+                    "end_line": chunk["end_line"],
+                    "chunk_type": "python",
+                    "id": self.generate_doc_id()
+                }
+            )
+            if chunk.get("class_name"):
+                # Lets the symbol index resolve the class of a method chunk
+                doc.metadata["class_name"] = chunk["class_name"]
+                doc.metadata["class_start_line"] = chunk["class_start_line"]
+                doc.metadata["class_end_line"] = chunk["class_end_line"]
+            result.append((doc, chunk))
+        return result
+
     # def load_and_split_documents(self, directory, file_types, splitter_type, chunk_size, chunk_overlap):
     #     all_file_paths = []
     #     for file_type in file_types:
@@ -284,14 +583,18 @@ class DocumentProcessor:
     def get_loader(self, file_path):
         ext = os.path.splitext(file_path)[1].lower()
         if ext == ".md":
+            from langchain_community.document_loaders import UnstructuredMarkdownLoader
             return UnstructuredMarkdownLoader(file_path)
         else:
+            from langchain_community.document_loaders import TextLoader
             return TextLoader(file_path)
 
     def get_text_splitter(self, splitter_type, chunk_size, chunk_overlap):
         if splitter_type == "Markdown":
+            from langchain.text_splitter import MarkdownTextSplitter
             return MarkdownTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         else:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
             return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
     def generate_doc_id(self):
@@ -300,7 +603,7 @@ class DocumentProcessor:
         """
         return str(uuid.uuid4())
 
-    def create_document(self, page_content: str, metadata: dict) -> Document:
+    def create_document(self, page_content: str, metadata: dict) -> "Document":
         """
         Create a Document object from the given content and metadata.
         
@@ -311,4 +614,5 @@ class DocumentProcessor:
         Returns:
             Document: The created Document object.
         """
+        from langchain_core.documents import Document
         return Document(page_content=page_content, metadata=metadata)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+
+class _MicroBatcher:
+    """
+    Collects texts submitted from concurrent threads during a short window and embeds
+    them with a single batched call. Identical texts in the same window share one slot.
+    """
+    def __init__(self, embed_fn, window_seconds: float = 0.01, max_batch_size: int = 64):
+        self.embed_fn = embed_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending = {}  # text -> Future
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        flush_now = False
+        with self._lock:
+            future = self._pending.get(text)
+            if future is not None:
+                return future
+            future = Future()
+            self._pending[text] = future
+            if len(self._pending) >= self.max_batch_size:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+        return future
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return
+        texts = list(batch)
+        try:
+            vectors = self.embed_fn(texts)
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for text, vector in zip(texts, vectors):
+            batch[text].set_result(vector)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-process LRU cache for query embeddings.
+
+    Cache misses are routed through a micro-batcher, so concurrent sessions asking
+    different questions at the same time share one embeddings request. Document
+    embeddings (ingestion) are passed straight through to the wrapped embeddings.
+    """
+    def __init__(self, base: Embeddings, max_entries: int = 2048, batch_window_seconds: float = 0.01, max_batch_size: int = 64):
+        self.base = base
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._batcher = _MicroBatcher(base.embed_documents, batch_window_seconds, max_batch_size)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list) -> list:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+
+        vector = self._batcher.submit(text).result()
+
+        with self._lock:
+            self._cache[text] = tuple(vector)
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return list(vector)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
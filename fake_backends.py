@@ -0,0 +1,183 @@
+"""
+Deterministic local stand-ins for the OpenAI embedding and chat models.
+
+They are used for load tests and benchmarks, either in-process (HashingEmbeddings,
+FakeChatModel) or as an OpenAI-compatible HTTP endpoint:
+
+    python fake_backends.py --port 8001
+    OPENAI_API_BASE=http://localhost:8001/v1 OPENAI_API_KEY=fake python service.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+import uuid
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from http_server import HTTPError, Response, serve
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag-of-words feature hashing into a fixed number of dimensions. Texts sharing
+    words get similar vectors, so similarity search behaves plausibly in benchmarks.
+    """
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def embed(self, text) -> list:
+        """Embeds a string, or a list of token ids as sent by OpenAI clients."""
+        if isinstance(text, str):
+            tokens = _WORD_PATTERN.findall(text.lower())
+        else:
+            tokens = [str(token) for token in text]
+        vector = [0.0] * self.dimensions
+        for token in tokens:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if (digest >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        if not norm:
+            vector[0] = 1.0
+            return vector
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed(text)
+
+
+def fake_answer_tokens(prompt: str, answer_tokens: int = 64) -> list:
+    """Deterministic answer tokens derived from the words of the prompt."""
+    words = _WORD_PATTERN.findall(prompt)[-32:] or ["answer"]
+    return [f"{words[i % len(words)]} " for i in range(answer_tokens)]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers deterministically with a configurable latency profile."""
+    first_token_latency: float = 0.0
+    tokens_per_second: float = 0.0  # 0 means no per-token delay
+    answer_tokens: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages) -> list:
+        return fake_answer_tokens(str(messages[-1].content), self.answer_tokens)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + (len(tokens) / self.tokens_per_second if self.tokens_per_second else 0))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_latency)
+        for token in self._tokens(messages):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeOpenAIEndpoint:
+    """OpenAI-compatible `/v1/embeddings` and `/v1/chat/completions` served locally."""
+    def __init__(self, dimensions: int = 256, first_token_latency: float = 0.2, tokens_per_second: float = 50.0, answer_tokens: int = 64):
+        self.embeddings = HashingEmbeddings(dimensions)
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+
+    async def handle(self, request):
+        if request.method != "POST":
+            raise HTTPError(405, "Only POST is supported.")
+        if request.path.endswith("/embeddings"):
+            return self._embeddings(request.json())
+        if request.path.endswith("/chat/completions"):
+            return await self._chat(request.json())
+        raise HTTPError(404, f"Unknown path {request.path}")
+
+    def _embeddings(self, payload):
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = [
+            {"object": "embedding", "index": i, "embedding": self.embeddings.embed(item)}
+            for i, item in enumerate(inputs)
+        ]
+        tokens = sum(len(item) if not isinstance(item, str) else len(item.split()) for item in inputs)
+        return Response(200, {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    async def _chat(self, payload):
+        messages = payload.get("messages", [])
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        tokens = fake_answer_tokens(prompt, self.answer_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = payload.get("model", "fake-chat")
+        created = int(time.time())
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+
+        if not payload.get("stream"):
+            await asyncio.sleep(self.first_token_latency + delay * len(tokens))
+            return Response(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens), "total_tokens": len(prompt.split()) + len(tokens)},
+            })
+
+        async def events():
+            await asyncio.sleep(self.first_token_latency)
+            for token in tokens + [None]:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": token} if token is not None else {},
+                        "finish_reason": None if token is not None else "stop",
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                if token is not None and delay:
+                    await asyncio.sleep(delay)
+            yield b"data: [DONE]\n\n"
+
+        return Response(200, content_type="text/event-stream", stream=events())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI-compatible embedding and chat endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    endpoint = FakeOpenAIEndpoint(args.dimensions, args.first_token_latency, args.tokens_per_second, args.answer_tokens)
+    print(f"Fake OpenAI endpoint listening on http://{args.host}:{args.port}/v1")
+    asyncio.run(serve(endpoint.handle, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method: str, path: str, query: dict, headers: dict, body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> dict:
+        if not self.body:
+            return {}
+        try:
+            payload = json.loads(self.body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "JSON body must be an object.")
+        return payload
+
+    def query_param(self, name: str, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+
+class Response:
+    """
+    An HTTP response. `body` may be a dict (sent as JSON), str or bytes.
+    With `stream` (an async iterator of bytes) the body is streamed and the
+    connection is closed afterwards, which is how server-sent events are sent.
+    """
+    def __init__(self, status: int = 200, body=None, content_type: str = "application/json", headers: dict = None, stream=None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.stream = stream
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """Parses one HTTP/1.1 request from the stream, or returns None when the client closed it."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line.")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length header.")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length header.")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+
+    path, _, query = target.partition("?")
+    return Request(method.upper(), path, parse_qs(query), headers, body)
+
+
+async def write_response(writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+    headers = {"Content-Type": response.content_type, **response.headers}
+    reason = REASONS.get(response.status, "")
+
+    if response.stream is not None:
+        headers["Connection"] = "close"
+        writer.write(_head(response.status, reason, headers))
+        async for chunk in response.stream:
+            writer.write(chunk)
+            await writer.drain()
+        return
+
+    body = response.body
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode("utf-8")
+    elif isinstance(body, str):
+        body = body.encode("utf-8")
+    elif body is None:
+        body = b""
+    headers["Content-Length"] = str(len(body))
+    headers["Connection"] = "keep-alive" if keep_alive else "close"
+    writer.write(_head(response.status, reason, headers) + body)
+    await writer.drain()
+
+
+def _head(status, reason, headers) -> bytes:
+    lines = [f"HTTP/1.1 {status} {reason}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _handle_connection(reader, writer, handler):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                try:
+                    response = await handler(request)
+                except HTTPError as e:
+                    response = Response(e.status, {"error": e.message}, headers=e.headers)
+            except HTTPError as e:
+                await write_response(writer, Response(e.status, {"error": e.message}), keep_alive=False)
+                break
+            except Exception as e:
+                response = Response(500, {"error": str(e)})
+            await write_response(writer, response, keep_alive)
+            if not keep_alive or response.stream is not None:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(handler, host: str, port: int):
+    """Serves `async handler(Request) -> Response` until cancelled."""
+    server = await asyncio.start_server(lambda r, w: _handle_connection(r, w, handler), host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,405 @@
+import os
+import json
+import time
+import logging
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    db_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT,
+    current_file TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    files_total INTEGER NOT NULL DEFAULT 0,
+    files_done INTEGER NOT NULL DEFAULT 0,
+    files_failed INTEGER NOT NULL DEFAULT 0,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    embeddings_done INTEGER NOT NULL DEFAULT 0,
+    elapsed_seconds REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    chunks INTEGER NOT NULL,
+    error TEXT,
+    PRIMARY KEY (job_id, file_path)
+);
+"""
+
+# Columns added after the first release; job tables created before are migrated on open
+_MIGRATIONS = {
+    "jobs": {"files_failed": "INTEGER NOT NULL DEFAULT 0"},
+    "job_files": {"error": "TEXT"},
+}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestJobQueue:
+    """
+    Background ingestion worker with a persistent SQLite job table.
+
+    Jobs are submitted with the same parameters as DocumentProcessor.process_documents
+    and processed file by file in worker threads, so the submitting Streamlit session
+    returns immediately. Progress is committed after every file: a cancelled, failed or
+    interrupted job (e.g. server restart) can be resumed and skips the files it already
+    ingested. At most `per_db_concurrency` jobs run at the same time for one vectordb.
+    A file that cannot be loaded does not fail the job: it is recorded with its error in
+    job_files and summarized in the job's `error`, and is retried when the job is resumed.
+    """
+    def __init__(self, vectorstore_manager, jobs_path: str = None, max_workers: int = 2, per_db_concurrency: int = 1):
+        self.vectorstore_manager = vectorstore_manager
+        self.jobs_path = jobs_path or os.path.join(vectorstore_manager.parent_dir, "ingest_jobs.sqlite")
+        self.max_workers = max_workers
+        self.per_db_concurrency = per_db_concurrency
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._running_per_db = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+            for table, columns in _MIGRATIONS.items():
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for name, definition in columns.items():
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.jobs_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def start(self):
+        """Requeues jobs orphaned by a dead process on this host and starts the workers."""
+        if self._threads:
+            return
+        self._recover_orphaned_jobs()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _recover_orphaned_jobs(self):
+        host = socket.gethostname()
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            for row in rows:
+                owner_host, _, pid = (row["owner"] or "").rpartition(":")
+                if owner_host == host and not _pid_alive(int(pid or 0)):
+                    conn.execute("UPDATE jobs SET status = 'queued', owner = NULL WHERE id = ?", (row["id"],))
+
+    def submit(self, db_name: str, directory: str, file_types: list, splitter_type="Recursive",
+               chunk_size=2000, chunk_overlap=200, batch_size=5, delay=1.0, kind="directory",
+               parent_chunk_size=None) -> str:
+        """Queues an ingestion job and returns its id."""
+        job_id = uuid.uuid4().hex
+        params = {
+            "kind": kind,
+            "directory": directory,
+            "file_types": list(file_types),
+            "splitter_type": splitter_type,
+            "chunk_size": int(chunk_size),
+            "chunk_overlap": int(chunk_overlap),
+            "batch_size": int(batch_size),
+            "delay": float(delay),
+            "parent_chunk_size": int(parent_chunk_size) if parent_chunk_size else None,
+        }
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, db_name, status, params, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, db_name, json.dumps(params), time.time())
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def submit_git_sync(self, db_name: str, repo_path: str, file_types: list, splitter_type="Recursive",
+                        chunk_size=2000, chunk_overlap=200, batch_size=5, delay=1.0, parent_chunk_size=None) -> str:
+        """Queues an incremental Git sync (see DocumentProcessor.sync_git_repository)."""
+        return self.submit(db_name, repo_path, file_types, splitter_type, chunk_size, chunk_overlap, batch_size, delay,
+                           kind="git_sync", parent_chunk_size=parent_chunk_size)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued job immediately; a running job stops after its current file."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            if cursor.rowcount:
+                return True
+            cursor = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+            return bool(cursor.rowcount)
+
+    def resume(self, job_id: str) -> bool:
+        """
+        Requeues a failed or cancelled job, or a finished directory job with failed files.
+        Already ingested files are skipped; files that failed to load are retried.
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', cancel_requested = 0, error = NULL, files_failed = 0, "
+                "files_done = files_done - (SELECT COUNT(*) FROM job_files WHERE job_id = ? AND error IS NOT NULL), "
+                "finished_at = NULL WHERE id = ? AND (status IN ('failed', 'cancelled') "
+                "OR (status = 'done' AND files_failed > 0 AND json_extract(params, '$.kind') = 'directory'))",
+                (job_id, job_id)
+            )
+            if cursor.rowcount:
+                conn.execute("DELETE FROM job_files WHERE job_id = ? AND error IS NOT NULL", (job_id,))
+        with self._wakeup:
+            self._wakeup.notify()
+        return bool(cursor.rowcount)
+
+    def get_job(self, job_id: str):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_failed_files(self, job_id: str) -> list:
+        """Files of a job that could not be loaded, as (file_path, error) tuples."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT file_path, error FROM job_files WHERE job_id = ? AND error IS NOT NULL ORDER BY file_path",
+                (job_id,)
+            ).fetchall()
+        return [(row["file_path"], row["error"]) for row in rows]
+
+    def list_jobs(self, db_name: str = None, limit: int = 50) -> list:
+        query = "SELECT * FROM jobs"
+        args = ()
+        if db_name:
+            query += " WHERE db_name = ?"
+            args = (db_name,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, (*args, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        elapsed = job["elapsed_seconds"]
+        for name in ("files", "chunks", "embeddings"):
+            job[f"{name}_per_s"] = job[f"{name}_done"] / elapsed if elapsed else 0.0
+        return job
+
+    def _claim_next_job(self):
+        with self._lock, closing(self._connect()) as conn, conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+            for row in rows:
+                if self._running_per_db.get(row["db_name"], 0) >= self.per_db_concurrency:
+                    continue
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, started_at = COALESCE(started_at, ?) "
+                    "WHERE id = ? AND status = 'queued'",
+                    (self.owner, time.time(), row["id"])
+                )
+                if cursor.rowcount:
+                    self._running_per_db[row["db_name"]] = self._running_per_db.get(row["db_name"], 0) + 1
+                    return dict(row)
+        return None
+
+    def _worker_loop(self):
+        while not self._stopping:
+            job = self._claim_next_job()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=2.0)
+                continue
+            try:
+                self._run_job(job)
+                self._update(job["id"], status="done", current_file=None, finished_at=time.time())
+            except JobCancelled:
+                self._update(job["id"], status="cancelled", cancel_requested=0, finished_at=time.time())
+            except Exception as e:
+                self._update(job["id"], status="failed", error=str(e), finished_at=time.time())
+            finally:
+                with self._lock:
+                    self._running_per_db[job["db_name"]] -= 1
+                with self._wakeup:
+                    self._wakeup.notify_all()
+
+    def _run_job(self, job):
+        job_id, db_name = job["id"], job["db_name"]
+        params = json.loads(job["params"])
+        if not os.path.exists(params["directory"]):
+            raise FileNotFoundError(f"Directory {params['directory']} not found.")
+
+        from document_processor import DocumentProcessor
+        processor = DocumentProcessor(self.vectorstore_manager, llm=None, parent_chunk_size=params.get("parent_chunk_size"))
+        if params.get("kind") == "git_sync":
+            return self._run_git_sync(job, params, processor)
+
+        text_splitter = processor.get_text_splitter(params["splitter_type"], params["chunk_size"], params["chunk_overlap"])
+        files = processor.find_files(params["directory"], params["file_types"])
+
+        with closing(self._connect()) as conn:
+            done_files = {row[0] for row in conn.execute("SELECT file_path FROM job_files WHERE job_id = ?", (job_id,))}
+            progress = conn.execute(
+                "SELECT files_done, files_failed, chunks_done, embeddings_done, elapsed_seconds, error "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        files_done, files_failed, chunks_done, embeddings_done, elapsed, error = progress
+
+        # A file that was interrupted half-way may be partially stored; drop it before redoing it
+        if job["current_file"]:
+            self.vectorstore_manager.delete_documents_by_source(db_name, [job["current_file"]])
+        self._update(job_id, files_total=len(files))
+
+        for file_path in files:
+            if file_path in done_files:
+                continue
+            if self._cancel_requested(job_id):
+                raise JobCancelled()
+
+            start = time.perf_counter()
+            self._update(job_id, current_file=file_path)
+            file_error = None
+            try:
+                documents = processor.load_file(file_path, text_splitter)
+            except Exception as e:
+                logger.exception(f"Job {job_id[:8]}: error processing file {file_path}")
+                file_error = str(e) or type(e).__name__
+                documents = []
+            if documents and not self.vectorstore_manager.add_documents(
+                    db_name, documents, batch_size=params["batch_size"], delay=params["delay"]):
+                raise RuntimeError(f"Failed to add the chunks of {file_path} to vectordb '{db_name}'.")
+
+            files_done += 1
+            chunks_done += len(documents)
+            embeddings_done += sum(1 for doc in documents if not doc.metadata.get("is_parent"))
+            elapsed += time.perf_counter() - start
+            if file_error is not None:
+                files_failed += 1
+                error = _failed_files_error(files_failed, file_path, file_error)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("INSERT OR REPLACE INTO job_files (job_id, file_path, chunks, error) VALUES (?, ?, ?, ?)",
+                             (job_id, file_path, len(documents), file_error))
+                conn.execute(
+                    "UPDATE jobs SET current_file = NULL, files_done = ?, files_failed = ?, chunks_done = ?, "
+                    "embeddings_done = ?, elapsed_seconds = ?, error = ? WHERE id = ?",
+                    (files_done, files_failed, chunks_done, embeddings_done, elapsed, error, job_id)
+                )
+
+    def _run_git_sync(self, job, params, processor):
+        """
+        Runs an incremental Git sync. The sync only records its commit once it has
+        finished, so a cancelled or interrupted sync is simply redone from the same diff.
+        """
+        job_id = job["id"]
+        start = time.perf_counter()
+
+        def on_progress(current, total, file_path):
+            self._update(job_id, files_total=total, files_done=current,
+                         elapsed_seconds=job["elapsed_seconds"] + time.perf_counter() - start)
+            if self._cancel_requested(job_id):
+                raise JobCancelled()
+
+        summary = processor.sync_git_repository(
+            job["db_name"], params["directory"], params["file_types"], params["splitter_type"],
+            params["chunk_size"], params["chunk_overlap"], params["batch_size"], params["delay"],
+            progress_callback=on_progress
+        )
+        failed_files = summary["failed_files"]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_files (job_id, file_path, chunks, error) VALUES (?, ?, 0, ?)",
+                [(job_id, file_path, error) for file_path, error in failed_files.items()]
+            )
+        last_failed = next(reversed(failed_files.items()), None)
+        self._update(
+            job_id,
+            files_total=summary["files_loaded"],
+            files_done=summary["files_loaded"],
+            chunks_done=summary["chunks_added"],
+            embeddings_done=summary["chunks_added"],
+            elapsed_seconds=job["elapsed_seconds"] + time.perf_counter() - start,
+            files_failed=len(failed_files),
+            error=_failed_files_error(len(failed_files), *last_failed) if last_failed else None,
+        )
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+
+def _failed_files_error(count: int, file_path: str, error: str) -> str:
+    return f"{count} file(s) failed to load; last: {file_path}: {error}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_ingest_queue(vectorstore_manager) -> IngestJobQueue:
+    """
+    Returns the started, process-wide job queue for the manager's parent directory.
+    Queues are never evicted, since their worker threads outlive any single session.
+    """
+    key = os.path.abspath(vectorstore_manager.parent_dir)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = IngestJobQueue(
+                vectorstore_manager,
+                max_workers=int(os.getenv("INGEST_MAX_WORKERS", "2")),
+                per_db_concurrency=int(os.getenv("INGEST_PER_DB_CONCURRENCY", "1")),
+            )
+            queue.start()
+            _queues[key] = queue
+        return queue
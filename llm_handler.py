@@ -1,20 +1,115 @@
 import os
-from langchain_community.chat_models import openai
-from langchain.chains import create_retrieval_chain
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
-from langchain.chains.combine_documents import create_stuff_documents_chain
+import time
 from dotenv import load_dotenv
+from token_counter import count_tokens
+from tracing import get_tracer
 
 load_dotenv()
 
+# langchain is imported on first use to keep page and worker start-up fast
+_answer_prompt = None
+
+
+def get_answer_prompt():
+    global _answer_prompt
+    if _answer_prompt is None:
+        from langchain_core.prompts import ChatPromptTemplate
+        _answer_prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an expert support assistant. Use the given context to answer the question."),
+            ("human", "Context: {context}\nQuestion: {input}")
+        ])
+    return _answer_prompt
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(count_tokens(message.content) for message in messages)
+
+
+def _record_usage(span, messages, response, model: str):
+    """Sets token counts on an "llm" span, from the usage reported by the model if available."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens") or _prompt_tokens(messages)
+    completion_tokens = usage.get("output_tokens") or count_tokens(response.content)
+    span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    tracer = get_tracer()
+    tracer.count("llm_tokens", prompt_tokens, model=model, kind="prompt")
+    tracer.count("llm_tokens", completion_tokens, model=model, kind="completion")
+
+
+class AnswerStream:
+    """
+    Iterable over the answer tokens of a single chat turn.
+
+    Records time-to-first-token and tokens/s while it is consumed. Iteration stops
+    early when the cancel event is set, or when the consumer closes the generator
+    (e.g. Streamlit aborting the script run because a new message was sent).
+    The finished stream is recorded as an "llm" stage with the tracer.
+    """
+    def __init__(self, chunks, cancel_event=None, model: str = None, prompt_tokens: int = None):
+        self._chunks = chunks
+        self.cancel_event = cancel_event
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.text = ""
+        self.finished = False
+        self.stats = {
+            "ttft": None,
+            "tokens": 0,
+            "tokens_per_s": 0.0,
+            "total_time": 0.0,
+            "cancelled": False,
+        }
+
+    def __iter__(self):
+        start = time.perf_counter()
+        first_token_at = None
+        try:
+            for chunk in self._chunks:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.stats["cancelled"] = True
+                    break
+                token = chunk.content
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    self.stats["ttft"] = first_token_at - start
+                self.stats["tokens"] += 1
+                self.text += token
+                yield token
+        except GeneratorExit:
+            self.stats["cancelled"] = True
+            raise
+        finally:
+            end = time.perf_counter()
+            close = getattr(self._chunks, "close", None)
+            if close:
+                close()
+            self.stats["total_time"] = end - start
+            if first_token_at is not None and end > first_token_at:
+                self.stats["tokens_per_s"] = self.stats["tokens"] / (end - first_token_at)
+            self.finished = True
+            self._trace()
+
+    def _trace(self):
+        tracer = get_tracer()
+        ttft = self.stats["ttft"]
+        tracer.record("llm", self.stats["total_time"], model=self.model, mode="stream",
+                      prompt_tokens=self.prompt_tokens, completion_tokens=self.stats["tokens"],
+                      ttft_ms=round(ttft * 1000, 3) if ttft is not None else None, cancelled=self.stats["cancelled"])
+        if self.prompt_tokens:
+            tracer.count("llm_tokens", self.prompt_tokens, model=self.model, kind="prompt")
+        tracer.count("llm_tokens", self.stats["tokens"], model=self.model, kind="completion")
+
+
 class LLMHandler:
-    def __init__(self, model="gpt-4o-mini", temperature=0.7):
+    def __init__(self, model="gpt-4o-mini", temperature=0.7, llm=None):
         self.model = model
         self.temperature = temperature
-        self.llm = self.initialize_llm()
+        self.llm = llm or self.initialize_llm()
 
     def initialize_llm(self):
+        from langchain_community.chat_models import openai
         return openai.ChatOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             model=self.model,
@@ -24,13 +119,12 @@ class LLMHandler:
     def create_retrieval_chain(self, vectorstore):
         if not vectorstore:
             return None
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert support assistant. Use the given context to answer the question."),
-            ("human", "Context: {context}\nQuestion: {input}")
-        ])
+        from langchain.chains import create_retrieval_chain
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+
         combine_documents_chain = create_stuff_documents_chain(
             llm=self.llm,
-            prompt=prompt
+            prompt=get_answer_prompt()
         )
         retriever = vectorstore.as_retriever()
         
@@ -39,12 +133,44 @@ class LLMHandler:
             combine_docs_chain=combine_documents_chain
         )
 
+    def _answer_messages(self, question: str, context_docs: list):
+        return get_answer_prompt().format_messages(
+            context="\n\n".join(doc.page_content for doc in context_docs),
+            input=question
+        )
+
+    def answer(self, question: str, context_docs: list) -> str:
+        """Answers a question over already retrieved context documents in one call."""
+        messages = self._answer_messages(question, context_docs)
+        with get_tracer().span("llm", model=self.model, mode="invoke") as span:
+            response = self.llm.invoke(messages)
+            _record_usage(span, messages, response, self.model)
+        return response.content
+
+    def stream_answer(self, question: str, context_docs: list, cancel_event=None) -> AnswerStream:
+        """
+        Streams the answer to a question over already retrieved context documents.
+
+        Args:
+        - question (str): The user question.
+        - context_docs (list): The retrieved documents to stuff into the prompt.
+        - cancel_event (threading.Event): Optional event that stops the stream when set.
+
+        Returns:
+        - AnswerStream: Iterable over the answer tokens, with latency stats in `.stats`.
+        """
+        messages = self._answer_messages(question, context_docs)
+        return AnswerStream(self.llm.stream(messages), cancel_event=cancel_event,
+                            model=self.model, prompt_tokens=_prompt_tokens(messages))
+
     def send_query(self, system_prompt: str, user_prompt: str):
-        response = self.llm([
+        from langchain.schema import SystemMessage, HumanMessage
+        messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=user_prompt)
-        ])
-
-        print(response)
+        ]
+        with get_tracer().span("llm", model=self.model, mode="query") as span:
+            response = self.llm(messages)
+            _record_usage(span, messages, response, self.model)
 
-        return response.content.strip()
\ No newline at end of file
+        return response.content.strip()
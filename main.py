@@ -1,9 +1,12 @@
 # main.py
 import streamlit as st
+from warmup import start_background_warmup
 
 def main():
     st.set_page_config(page_title="Wiki Q&A Chatbot", layout="wide")
     st.title("📚 Wiki Q&A Chatbot")
+    # Import langchain and open the vectordbs while the user is still on this page
+    start_background_warmup()
     st.write("""
         Welcome to the **Wiki Q&A Chatbot** application!
 
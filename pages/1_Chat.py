@@ -1,7 +1,12 @@
 # pages/1_Chat.py
+import threading
 import streamlit as st
-from vector_store import VectorStoreManager
-from llm_handler import LLMHandler
+from shared_resources import get_vectorstore_manager, get_llm_handler
+from answer_cache import get_answer_cache
+from reranker import get_reranker
+from warmup import start_background_warmup
+from tracing import get_tracer
+from symbol_index import merge_definitions
 import logging
 
 # Configure logging
@@ -9,25 +14,70 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 
 
 def initialize_vectorstore(vsm, selected_db):
-    """Initialize the vectorstore for the selected database."""
-    if "vectorstore" not in st.session_state or st.session_state.get("selected_db") != selected_db:
-        vectorstore = vsm.get_vectorstore(selected_db)
-        if vectorstore is None:
-            st.error(f"Failed to load VectorDB '{selected_db}'.")
-            return None
-        st.session_state.vectorstore = vectorstore
-        st.session_state.selected_db = selected_db
-    return st.session_state.vectorstore
-
-
-def initialize_retrieval_chain(model_choice, temperature):
-    """Initialize the LLM retrieval chain."""
-    if "retrieval_chain" not in st.session_state:
-        llm_handler = LLMHandler(model=model_choice, temperature=temperature)
-        retrieval_chain = llm_handler.create_retrieval_chain(st.session_state.vectorstore)
-        st.session_state.retrieval_chain = retrieval_chain
-        st.session_state.llm_handler = llm_handler
-    return st.session_state.retrieval_chain
+    """
+    Get the shared vectorstore for the selected database.
+    The session only remembers the database name; the collection itself is shared.
+    """
+    vectorstore = vsm.get_vectorstore(selected_db) if selected_db else None
+    if vectorstore is None:
+        st.error(f"Failed to load VectorDB '{selected_db}'.")
+        return None
+    st.session_state.selected_db = selected_db
+    return vectorstore
+
+
+def initialize_llm_handler(model_choice, temperature):
+    """Get the shared LLM handler for the current model settings."""
+    return get_llm_handler(model=model_choice, temperature=temperature)
+
+
+def finalize_pending_answer():
+    """
+    Stores the partial answer of a stream that was interrupted by a new message.
+
+    Streamlit aborts the running script when the user sends a new message, so the
+    interrupted turn never reaches the code that appends the assistant message.
+    """
+    pending = st.session_state.pop("pending_answer", None)
+    if pending is None:
+        return
+    if "cancel_event" in st.session_state:
+        st.session_state.cancel_event.set()
+    stats = record_turn_metrics(pending)
+    if pending.text:
+        content = pending.text + (" …*(cancelled)*" if stats["cancelled"] else "")
+        st.session_state.messages.append({"role": "assistant", "content": content, "metrics": stats})
+
+
+def record_turn_metrics(answer_stream):
+    """Keeps the latency stats of a streamed turn in the session and logs them."""
+    stats = dict(answer_stream.stats)
+    st.session_state.setdefault("turn_metrics", []).append(stats)
+    ttft = f"{stats['ttft']:.2f}s" if stats["ttft"] is not None else "n/a"
+    logging.info(
+        f"Turn metrics: ttft={ttft} tokens={stats['tokens']} "
+        f"tokens/s={stats['tokens_per_s']:.1f} total={stats['total_time']:.2f}s cancelled={stats['cancelled']}"
+    )
+    return stats
+
+
+def cache_namespace(vsm, selected_db, model_choice):
+    """Answers are only reused for the same vectordb and model."""
+    return (vsm.get_db_path(selected_db), model_choice)
+
+
+def format_turn_metrics(stats):
+    if stats.get("cache_similarity") is not None:
+        return f"⚡ answered from cache (similarity {stats['cache_similarity']:.3f})"
+    ttft = f"{stats['ttft']:.2f} s" if stats["ttft"] is not None else "n/a"
+    caption = f"⏱️ first token {ttft} · {stats['tokens_per_s']:.1f} tokens/s · {stats['total_time']:.1f} s total"
+    if stats.get("rerank_ms") is not None:
+        caption += f" · rerank {stats['rerank_ms']:.1f} ms ({stats['context_docs']} docs)"
+    if stats.get("symbols"):
+        caption += f" · symbol lookup: {', '.join(stats['symbols'])}"
+    elif stats.get("matched_chunks") not in (None, stats.get("context_docs")):
+        caption += f" · {stats['matched_chunks']} chunks → {stats['context_docs']} sections"
+    return caption
 
 
 def reset_chat():
@@ -37,10 +87,10 @@ def reset_chat():
         "documents_processed",
         "file_summaries",
         "table_of_contents",
-        "retrieval_chain",
-        "llm_handler",
         "context",
-        "vectorstore",
+        "pending_answer",
+        "cancel_event",
+        "turn_metrics",
         "selected_db",
     ]
     for key in keys_to_clear:
@@ -52,6 +102,7 @@ def reset_chat():
 def main():
     st.set_page_config(page_title="Chat - Wiki Q&A Chatbot", layout="wide")
     st.title("💬 Chat Interface")
+    start_background_warmup()
 
     # Sidebar Settings
     st.sidebar.header("⚙️ LLM Settings")
@@ -60,29 +111,53 @@ def main():
 
     st.sidebar.header("📂 Vector Database Selection")
     persist_directory = st.sidebar.text_input("Persist Directory for Vector Store:", value="./chroma_db")
-    vsm = VectorStoreManager(parent_dir=persist_directory)
+    vsm = get_vectorstore_manager(persist_directory)
     available_dbs = vsm.list_vectordbs()  # List available vector databases
     selected_db = st.sidebar.selectbox("Select a VectorDB to Chat With:", available_dbs)
 
+    st.sidebar.header("⚡ Answer Cache")
+    use_answer_cache = st.sidebar.checkbox("Reuse answers to similar questions", value=True)
+    cache_threshold = st.sidebar.slider("Similarity threshold", 0.80, 1.0, get_answer_cache().similarity_threshold, 0.01)
+
+    st.sidebar.header("🎯 Reranking")
+    use_reranker = st.sidebar.checkbox("Rerank retrieved chunks", value=True)
+    fetch_k = st.sidebar.number_input("Candidates to retrieve (N):", min_value=1, value=50, step=10)
+    top_m = st.sidebar.number_input(
+        "Chunks passed to the LLM (M):", min_value=1, max_value=20, value=8, step=1,
+        help="Bounds the prompt size with and without reranking."
+    )
+    expand_parents = st.sidebar.checkbox(
+        "Expand to parent sections", value=True,
+        help="For vectordbs built in parent-document mode, pass each matched chunk's whole section to the LLM."
+    )
+
+    use_symbol_index = st.sidebar.checkbox(
+        "Look up code symbols first", value=True,
+        help="Questions naming a function, class or method (e.g. `DocumentProcessor.load_file`) get its definition without a similarity search. "
+             "Ambiguous names are added to the search results instead."
+    )
+
     clear_button = st.sidebar.button("🧹 Clear Chat and Reload", on_click=reset_chat)
 
-    # Initialize Vector Store and Retrieval Chain
+    # Get the shared Vector Store and LLM Handler
     vectorstore = initialize_vectorstore(vsm, selected_db)
     if not vectorstore:
         return
 
-    retrieval_chain = initialize_retrieval_chain(model_choice, temperature)
-    if not retrieval_chain:
-        return
+    llm_handler = initialize_llm_handler(model_choice, temperature)
 
     # Initialize Session State Variables
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    finalize_pending_answer()
+
     # Display Chat Messages
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("metrics"):
+                st.caption(format_turn_metrics(message["metrics"]))
 
     # User Input
     user_input = st.chat_input("Ask a question about your selected VectorDB:")
@@ -92,26 +167,94 @@ def main():
         with st.chat_message("user"):
             st.markdown(user_input)
 
+        # Questions naming an unambiguous code symbol are answered from its definition chunk,
+        # found in the symbol index without embedding the query
+        tracer = get_tracer()
+        symbol_docs = []
+        if use_symbol_index:
+            with tracer.span("symbol_lookup", db=selected_db) as span:
+                symbol_docs = vsm.find_symbol_definitions(selected_db, user_input)
+                span.set(results=len(symbol_docs))
+        exact_symbol_docs = [doc for doc in symbol_docs if doc.metadata["symbol_exact"]]
+
+        answer_cache = get_answer_cache()
+        namespace = cache_namespace(vsm, selected_db, model_choice)
+        db_version = vsm.get_db_version(selected_db)
+        query_embedding = None
+        if not exact_symbol_docs:
+            # Embed the query once; it is used for the cache lookup and the similarity search
+            with tracer.span("embed", kind="query"):
+                query_embedding = vectorstore.embeddings.embed_query(user_input)
+
+        if use_answer_cache and query_embedding is not None:
+            cached = answer_cache.lookup(namespace, query_embedding, db_version, similarity_threshold=cache_threshold)
+            if cached is not None:
+                cached_answer, similarity = cached
+                stats = {"cache_similarity": similarity}
+                with st.chat_message("assistant"):
+                    st.markdown(cached_answer)
+                    st.caption(format_turn_metrics(stats))
+                st.session_state.messages.append({"role": "assistant", "content": cached_answer, "metrics": stats})
+                return
+
         # Process Input and Generate Response
-        retriever = st.session_state.vectorstore.as_retriever(search_kwargs={"k": 50})
-        context_docs = retriever.get_relevant_documents(user_input)
+        rerank_stats = None
+        if exact_symbol_docs:
+            context_docs = exact_symbol_docs
+        else:
+            with tracer.span("retrieve", db=selected_db, k=fetch_k) as span:
+                context_docs = vectorstore.similarity_search_by_vector(query_embedding, k=fetch_k)
+                span.set(results=len(context_docs))
+            # Definitions of ambiguous names compete with the search results for the M slots
+            context_docs = merge_definitions(symbol_docs, context_docs)
+            if use_reranker:
+                with tracer.span("rerank", candidates=len(context_docs)):
+                    context_docs, rerank_stats = get_reranker().rerank(user_input, context_docs, top_m=top_m)
+            else:
+                # Without reranking the prompt still gets at most M chunks, the most similar ones
+                context_docs = context_docs[:top_m]
+        matched_chunks = len(context_docs)
+        if expand_parents and not exact_symbol_docs:
+            context_docs = vsm.expand_to_parents(selected_db, context_docs)
 
-        # Log context documents (optional)
-        for doc in context_docs:
-            logging.info(f"Document Metadata: {doc.metadata}")
-            logging.info(f"Document Content: {doc.page_content}")
+        # Document bodies are only logged when explicitly enabled (TRACE_LOG_BODIES=1)
+        logging.debug(f"Context: {len(context_docs)} documents from "
+                      f"{sorted({doc.metadata.get('source', 'Unknown Source') for doc in context_docs})}")
+        if tracer.log_bodies:
+            for doc in context_docs:
+                logging.debug(f"Document {doc.metadata.get('id')}: {doc.page_content}")
 
         formatted_context = "\n\n".join([doc.page_content for doc in context_docs])
         st.session_state.context = formatted_context
 
-        with st.spinner("🧠 Generating answer from LLM..."):
-            response = st.session_state.retrieval_chain.invoke({"input": user_input})
-            assistant_response = response["answer"]
+        # Cancel a stream that may still be running for this session
+        if "cancel_event" in st.session_state:
+            st.session_state.cancel_event.set()
+        cancel_event = threading.Event()
+        st.session_state.cancel_event = cancel_event
+
+        answer_stream = llm_handler.stream_answer(
+            user_input, context_docs, cancel_event=cancel_event
+        )
+        st.session_state.pending_answer = answer_stream
 
-            # Append assistant message
-            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-            with st.chat_message("assistant"):
-                st.markdown(assistant_response)
+        with st.chat_message("assistant"):
+            st.write_stream(answer_stream)
+            st.session_state.pop("pending_answer", None)
+            stats = record_turn_metrics(answer_stream)
+            if rerank_stats is not None:
+                stats["rerank_ms"] = rerank_stats["latency_ms"]
+            stats["context_docs"] = len(context_docs)
+            stats["matched_chunks"] = matched_chunks
+            if exact_symbol_docs:
+                stats["symbols"] = sorted({doc.metadata["symbol"] for doc in exact_symbol_docs})
+            st.caption(format_turn_metrics(stats))
 
+        # Append assistant message
+        st.session_state.messages.append(
+            {"role": "assistant", "content": answer_stream.text, "metrics": stats}
+        )
+        if use_answer_cache and query_embedding is not None and not stats["cancelled"] and answer_stream.text:
+            answer_cache.store(namespace, user_input, query_embedding, answer_stream.text, db_version)
 
 main()
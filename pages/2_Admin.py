@@ -1,52 +1,138 @@
 import streamlit as st
-from llm_handler import LLMHandler
-from vector_store import VectorStoreManager
-from document_processor import DocumentProcessor
+from shared_resources import get_vectorstore_manager
+from ingest_jobs import get_ingest_queue
+from warmup import start_background_warmup
 import logging
 import os
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
-def main():
-    st.set_page_config(page_title="Admin - Wiki Q&A Chatbot", layout="wide")
-    st.title("🛠️ Admin & Management")
+@st.fragment(run_every=2)
+def render_ingest_jobs(ingest_queue, db_name):
+    """Polls the background ingestion jobs of a vectordb and offers cancel/resume."""
+    st.subheader("Ingestion Jobs")
+    jobs = ingest_queue.list_jobs(db_name)
+    if not jobs:
+        st.info("No ingestion jobs for this vectordb yet.")
+        return
 
-    # Initialize VectorStoreManager
-    if 'vectorstore_manager' not in st.session_state:
-        st.session_state.vectorstore_manager = VectorStoreManager()
+    st.dataframe(
+        [
+            {
+                "job": job["id"][:8],
+                "status": job["status"],
+                "files": f"{job['files_done']}/{job['files_total']}",
+                "failed files": job["files_failed"],
+                "chunks": job["chunks_done"],
+                "files/s": round(job["files_per_s"], 2),
+                "chunks/s": round(job["chunks_per_s"], 2),
+                "embeddings/s": round(job["embeddings_per_s"], 2),
+                "current file": job["current_file"] or "",
+                "error": job["error"] or "",
+            }
+            for job in jobs
+        ],
+        use_container_width=True,
+    )
 
-    vectorstore_manager = st.session_state.vectorstore_manager
+    job_ids = {job["id"][:8]: job["id"] for job in jobs}
+    selected_job = st.selectbox("Job:", list(job_ids), key=f"ingest_job_{db_name}")
+    failed_files = ingest_queue.list_failed_files(job_ids[selected_job])
+    if failed_files:
+        with st.expander(f"⚠️ {len(failed_files)} file(s) of job {selected_job} failed to load"):
+            st.dataframe([{"file": path, "error": error} for path, error in failed_files], use_container_width=True)
+    cancel_col, resume_col = st.columns(2)
+    if cancel_col.button("⏹️ Cancel Job"):
+        if ingest_queue.cancel(job_ids[selected_job]):
+            st.success(f"Cancellation of job {selected_job} requested.")
+        else:
+            st.warning("Only queued or running jobs can be cancelled.")
+    if resume_col.button("▶️ Resume Job"):
+        if ingest_queue.resume(job_ids[selected_job]):
+            st.success(f"Job {selected_job} queued again.")
+        else:
+            st.warning("Only failed or cancelled jobs, or finished jobs with failed files, can be resumed.")
 
-    # Initialize LLMHandler
-    if 'llm_handler' not in st.session_state:
-        st.session_state.llm_handler = LLMHandler()
 
-    llm_handler = st.session_state.llm_handler
+def render_sources(vectorstore_manager, db_name):
+    """Source files of a vectordb from its catalog, without scanning the collection."""
+    st.subheader("Sources")
+    catalog = vectorstore_manager.get_catalog(db_name)
+    if not catalog.is_complete():
+        st.warning("The source catalog of this vectordb is incomplete (it was created before the catalog existed).")
+        if st.button("🔄 Build Catalog"):
+            with st.spinner("Scanning the collection..."):
+                totals = vectorstore_manager.rebuild_catalog(db_name)
+            st.success(f"✅ Catalogued {totals['chunks']} chunks of {totals['sources']} sources.")
+        return
 
-    # Initialize DocumentProcessor
-    if 'document_processor' not in st.session_state:
-        st.session_state.document_processor = DocumentProcessor(vectorstore_manager, llm_handler)
+    totals = catalog.totals()
+    sources_col, chunks_col, tokens_col = st.columns(3)
+    sources_col.metric("Sources", totals["sources"])
+    chunks_col.metric("Chunks", totals["chunks"])
+    tokens_col.metric("Tokens", totals["tokens"])
+    symbol_totals = vectorstore_manager.get_symbol_index(db_name).totals()
+    st.caption(f"Symbol index: {symbol_totals['symbols']} Python symbols, {symbol_totals['references']} call sites.")
+    if not symbol_totals["symbols"] and st.button("🔄 Rebuild Catalog and Symbol Index"):
+        # Vectordbs ingested before the symbol index existed
+        with st.spinner("Scanning the collection..."):
+            vectorstore_manager.rebuild_catalog(db_name)
+        st.rerun()
 
-    document_processor = st.session_state.document_processor
+    prefix = st.text_input("Path prefix:", value="", key=f"sources_prefix_{db_name}")
+    page_size = 200
+    page = st.number_input("Page:", min_value=1, value=1, step=1, key=f"sources_page_{db_name}")
+    sources = catalog.list_sources(prefix=prefix.strip() or None, limit=page_size, offset=(page - 1) * page_size)
+    st.dataframe(
+        [
+            {
+                "source": row["source"],
+                "chunks": row["chunk_count"],
+                "tokens": row["token_count"],
+                "ingested": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["ingested_at"])),
+                "hash": (row["content_hash"] or "")[:12],
+            }
+            for row in sources
+        ],
+        use_container_width=True,
+    )
+
+    if st.button("🔍 Find Stale Files"):
+        stale = catalog.find_stale(check_hash=True)
+        st.session_state[f"stale_sources_{db_name}"] = [source for source, _ in stale]
+        if stale:
+            st.dataframe([{"source": source, "reason": reason} for source, reason in stale], use_container_width=True)
+        else:
+            st.success("✅ All sources are up to date.")
+
+    selected_sources = st.multiselect(
+        "Sources to delete:",
+        list(dict.fromkeys(st.session_state.get(f"stale_sources_{db_name}", []) + [row["source"] for row in sources])),
+        key=f"sources_delete_{db_name}"
+    )
+    if st.button("🗑️ Delete Chunks of Selected Sources"):
+        if not selected_sources:
+            st.warning("⚠️ Please select at least one source.")
+        elif vectorstore_manager.delete_documents_by_source(db_name, selected_sources):
+            st.success(f"✅ Deleted the chunks of {len(selected_sources)} source(s).")
+        else:
+            st.error("❌ Failed to delete the selected sources.")
+
+
+def main():
+    st.set_page_config(page_title="Admin - Wiki Q&A Chatbot", layout="wide")
+    st.title("🛠️ Admin & Management")
+    start_background_warmup()
 
     # Sidebar Settings
     st.sidebar.header("⚙️ Admin Settings")
-    model_choice = st.sidebar.selectbox("Select model:", ["gpt-4o-mini", "gpt-4"], index=0)
-    temperature = st.sidebar.slider("Temperature", 0.0, 1.0, 0.7, 0.1)
     parent_dir = st.sidebar.text_input("Parent Directory for Vector Stores:", value="./chroma_db")
 
-    # Update VectorStoreManager if parent_dir changes
-    if vectorstore_manager.parent_dir != parent_dir:
-        st.session_state.vectorstore_manager = VectorStoreManager(parent_dir=parent_dir)
-        st.session_state.document_processor.vectorstore_manager = st.session_state.vectorstore_manager
-        vectorstore_manager = st.session_state.vectorstore_manager
-
-    # Update LLMHandler settings
-    if llm_handler.model != model_choice or llm_handler.temperature != temperature:
-        st.session_state.llm_handler = LLMHandler(model=model_choice, temperature=temperature)
-        st.session_state.document_processor.llm = st.session_state.llm_handler
-        llm_handler = st.session_state.llm_handler
+    # Shared, process-wide resources keyed by parent_dir
+    vectorstore_manager = get_vectorstore_manager(parent_dir)
+    ingest_queue = get_ingest_queue(vectorstore_manager)
 
     # Tabs for different functionalities
     tabs = st.tabs(["Create New Vectordb", "List Existing Vectordbs", "Manage Vectordb"])
@@ -86,7 +172,7 @@ def main():
         if selected_db:
             st.markdown(f"### Managing Vectordb: **{selected_db}**")
 
-            manage_tabs = st.tabs(["Add Documents", "List Documents", "Delete Documents", "Delete Vectordb"])
+            manage_tabs = st.tabs(["Add Documents", "Sources", "List Documents", "Delete Documents", "Delete Vectordb"])
 
             with manage_tabs[0]:
                 st.subheader("Add Documents to Vectordb")
@@ -95,6 +181,15 @@ def main():
                 splitter_type = st.selectbox("Splitter Type", ["Recursive", "Markdown"], index=0)
                 chunk_size = st.number_input("Chunk size:", min_value=100, value=1000, step=100)
                 chunk_overlap = st.number_input("Chunk overlap:", min_value=0, value=200, step=50)
+                parent_mode = st.checkbox(
+                    "Parent-document mode: embed small chunks, answer with their parent sections",
+                    help="Markdown sections and Python classes are stored as parents; the chunk size above applies to the embedded child chunks."
+                )
+                parent_chunk_size = st.number_input("Parent chunk size:", min_value=500, value=4000, step=500, disabled=not parent_mode)
+                git_sync = st.checkbox(
+                    "Directory is a Git repository: only sync files changed since the last sync",
+                    value=os.path.isdir(os.path.join(directory.strip(), ".git")) if directory.strip() else False
+                )
                 
                 if st.button("📂 Add Documents"):
                     if not directory.strip():
@@ -102,29 +197,38 @@ def main():
                     elif not os.path.exists(directory):
                         st.error("❌ The specified directory does not exist.")
                     else:
-                        with st.spinner("Processing and adding documents..."):
-                            try:
-                                document_processor.process_documents(
-                                    db_name=selected_db,
-                                    directory=directory.strip(),
-                                    file_types=file_types_selected,
-                                    splitter_type=splitter_type,
-                                    chunk_size=chunk_size,
-                                    chunk_overlap=chunk_overlap,
-                                    progress_callback=lambda current, total, file: st.text(f"Processing {current}/{total}: {file}")
-                                )
-                                st.success("✅ Documents added successfully.")
-                            except Exception as e:
-                                st.error(f"❌ Error processing documents: {e}")
+                        submit = ingest_queue.submit_git_sync if git_sync else ingest_queue.submit
+                        job_id = submit(
+                            selected_db,
+                            directory.strip(),
+                            file_types=file_types_selected,
+                            splitter_type=splitter_type,
+                            chunk_size=chunk_size,
+                            chunk_overlap=chunk_overlap,
+                            parent_chunk_size=parent_chunk_size if parent_mode else None
+                        )
+                        st.success(f"✅ Ingestion job {job_id[:8]} queued. You can leave this page; it runs in the background.")
+
+                render_ingest_jobs(ingest_queue, selected_db)
 
 
             with manage_tabs[1]:
+                render_sources(vectorstore_manager, selected_db)
+
+            with manage_tabs[2]:
                 st.subheader("List Documents in Vectordb")
-                documents = vectorstore_manager.list_documents(selected_db)
+                page_size = 50
+                source_filter = st.text_input("Source file (optional):", value="", key=f"documents_source_{selected_db}")
+                page = st.number_input("Page:", min_value=1, value=1, step=1, key=f"documents_page_{selected_db}")
+                offset = (page - 1) * page_size
+                documents = vectorstore_manager.list_documents(
+                    selected_db, limit=page_size, offset=offset, source=source_filter.strip() or None
+                )
 
                 if documents:
+                    st.caption(f"Chunks {offset + 1}-{offset + len(documents)}")
                     # Iterate over each document
-                    for i, doc in enumerate(documents, start=1):
+                    for i, doc in enumerate(documents, start=offset + 1):
                         # Display the content as is
                         st.markdown(f"### Document {i}")
                         st.markdown(f"**Content:**\n\n{doc['content']}")
@@ -145,7 +249,7 @@ def main():
                     st.info("No documents found in this vectordb.")
 
 
-            # with manage_tabs[2]:
+            # with manage_tabs[3]:
             #     st.subheader("Delete Documents from Vectordb")
             #     documents = vectorstore_manager.list_documents(selected_db)
             #     if documents:
@@ -169,7 +273,7 @@ def main():
             #     else:
             #         st.info("No documents available to delete.")
 
-            with manage_tabs[3]:
+            with manage_tabs[4]:
                 st.subheader("Delete Vectordb")
                 if st.button("🗑️ Delete Vectordb"):
                     confirm = st.checkbox(f"Are you sure you want to delete vectordb '{selected_db}'? This action cannot be undone.")
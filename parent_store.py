@@ -0,0 +1,66 @@
+import os
+import json
+from contextlib import closing
+
+from sqlite_sidecar import SQLiteSidecar
+
+PARENT_STORE_FILENAME = "parents.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parents (
+    id TEXT PRIMARY KEY,
+    source TEXT,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parents_source ON parents (source);
+"""
+
+
+class ParentStore(SQLiteSidecar):
+    """
+    Key-value store for parent sections in parent-document mode.
+
+    Only the small child chunks are embedded; each child carries the id of its parent
+    (a Markdown section or a Python class), whose full text lives here and is looked
+    up by id at query time.
+    """
+    SCHEMA = _SCHEMA
+    TABLES = ("parents",)
+
+    def put_many(self, documents: list):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO parents (id, source, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (doc.metadata["id"], doc.metadata.get("source"), doc.page_content, json.dumps(doc.metadata))
+                    for doc in documents
+                ]
+            )
+
+    def get_many(self, ids: list) -> dict:
+        """Returns {id: (text, metadata)} for the ids that exist."""
+        if not ids or not os.path.exists(self.path):
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT id, text, metadata FROM parents WHERE id IN ({placeholders})", list(ids)).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def delete_ids(self, ids: list):
+        if not os.path.exists(self.path):
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM parents WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+
+    def delete_sources(self, sources: list):
+        if not os.path.exists(self.path):
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM parents WHERE source = ?", [(source,) for source in sources])
+
+    def count(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
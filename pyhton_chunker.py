@@ -59,7 +59,11 @@ def get_python_chunks(file_path):
                         "source": function_source,
                         "file_path": file_path,
                         "start_line": start_line,
-                        "end_line": end_line
+                        "end_line": end_line,
+                        # Umgebende Klasse, z.B. als Parent-Dokument im Parent-Child-Retrieval
+                        "class_name": node.name,
+                        "class_start_line": node.lineno - 1,
+                        "class_end_line": node.end_lineno
                     })
 
         elif isinstance(node, ast.FunctionDef):
@@ -0,0 +1,146 @@
+import math
+import os
+import re
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens; identifiers like `add_master_toc` or `a.b` are split into parts."""
+    return [token.lower() for token in _TOKEN_PATTERN.findall(text or "")]
+
+
+class LexicalReranker:
+    """
+    Cheap CPU reranker for the second retrieval stage.
+
+    The first stage (vector search) fetches the top-N candidates; the reranker re-scores
+    them and keeps only the top-M for the prompt. The default score is BM25 computed over
+    the candidate set, plus boosts when query terms appear in the chunk's Markdown heading
+    path (metadata 'section'), its Python chunk name or its source path, plus a small prior
+    from the first-stage rank. A custom `scorer(query, docs) -> list[float]` (e.g. a small
+    cross-encoder) can replace BM25.
+
+    Scoring is capped at `max_latency_ms`; when the budget is exceeded the first-stage
+    order is kept, so a slow scorer can never stall a chat turn. A custom scorer runs on a
+    worker thread that is waited on with the remaining budget; a call that overruns it is
+    abandoned (it finishes in the background, its result is discarded).
+    """
+    def __init__(self, scorer=None, max_latency_ms: float = 50.0, k1: float = 1.2, b: float = 0.75,
+                 heading_boost: float = 1.5, path_boost: float = 1.0, rank_prior: float = 0.5):
+        self.scorer = scorer
+        self.max_latency_ms = max_latency_ms
+        self.k1 = k1
+        self.b = b
+        self.heading_boost = heading_boost
+        self.path_boost = path_boost
+        self.rank_prior = rank_prior
+        self._lock = threading.Lock()
+        self._scorer_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rerank-scorer") if scorer else None
+        self.calls = 0
+        self.timeouts = 0
+        self.total_latency_ms = 0.0
+
+    def rerank(self, query: str, docs: list, top_m: int = 8):
+        """
+        Re-scores the candidates and returns (top_m documents, stats).
+
+        Stats contain the rerank latency in milliseconds, the number of candidates and
+        whether the latency cap was hit.
+        """
+        start = time.perf_counter()
+        deadline = start + self.max_latency_ms / 1000
+        timed_out = False
+
+        if len(docs) <= top_m:
+            ranked = list(docs)
+        else:
+            scores = self._score(query, docs, deadline)
+            if scores is None:
+                timed_out = True
+                ranked = list(docs[:top_m])
+            else:
+                order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+                ranked = []
+                for i in order[:top_m]:
+                    docs[i].metadata["rerank_score"] = round(scores[i], 4)
+                    ranked.append(docs[i])
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.timeouts += int(timed_out)
+            self.total_latency_ms += latency_ms
+        return ranked, {
+            "latency_ms": latency_ms,
+            "candidates": len(docs),
+            "kept": len(ranked),
+            "timed_out": timed_out,
+        }
+
+    def _score(self, query, docs, deadline):
+        if self.scorer is not None:
+            future = self._scorer_pool.submit(lambda: list(self.scorer(query, docs)))
+            try:
+                return future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FutureTimeoutError:
+                future.cancel()  # Only effective if it has not started yet
+                return None
+
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return [self._prior(rank, len(docs)) for rank in range(len(docs))]
+
+        doc_terms = [Counter(tokenize(doc.page_content)) for doc in docs]
+        if time.perf_counter() > deadline:
+            return None
+        avg_len = sum(sum(terms.values()) for terms in doc_terms) / len(docs) or 1.0
+        doc_freq = Counter(term for terms in doc_terms for term in query_terms if term in terms)
+
+        scores = []
+        for rank, (doc, terms) in enumerate(zip(docs, doc_terms)):
+            if time.perf_counter() > deadline:
+                return None
+            doc_len = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc_len / avg_len))
+            score += self.heading_boost * self._overlap(query_terms, self._headings(doc))
+            score += self.path_boost * self._overlap(query_terms, doc.metadata.get("source", ""))
+            score += self._prior(rank, len(docs))
+            scores.append(score)
+        return scores
+
+    def _prior(self, rank, total):
+        return self.rank_prior * (1 - rank / total)
+
+    @staticmethod
+    def _headings(doc) -> str:
+        # Loaders strip the raw '#' markers, so headings come from the metadata set at ingestion
+        return " ".join(filter(None, (doc.metadata.get("section"), doc.metadata.get("python_chunk_name"))))
+
+    @staticmethod
+    def _overlap(query_terms, text) -> float:
+        terms = set(tokenize(text))
+        return len(query_terms & terms) / len(query_terms)
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> LexicalReranker:
+    """Returns the process-wide reranker, configured from the environment on first use."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = LexicalReranker(max_latency_ms=float(os.getenv("RERANK_MAX_LATENCY_MS", "50")))
+        return _reranker
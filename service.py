@@ -0,0 +1,232 @@
+"""
+Headless HTTP query service for bots and IDE plugins, next to the Streamlit UI.
+
+    python service.py --parent-dir ./chroma_db --port 8000
+
+Endpoints:
+- POST /query     {"db": ..., "question": ..., "k": 50, "top_m": 8, "rerank": true, "expand_parents": true, "symbols": true}
+- POST /retrieve  {"db": ..., "query": ..., "k": 50, "top_m": 8, "rerank": true, "expand_parents": true, "symbols": true}
+- GET  /ingest/status[?db=...]
+- GET  /health
+- GET  /metrics[?format=json]   Prometheus text format of the per-stage metrics (see tracing.py)
+
+At most `--max-in-flight` requests are processed at once; further requests get a
+429 with Retry-After. Blocking LangChain calls run on a thread pool sized to that
+limit. The service is a separate process: it uses the same classes as the UI, but
+its Chroma clients, answer cache and embedding cache are its own, shared only by
+the requests of this process. The vectordbs on disk are the only shared state.
+Use `--fake` (or the endpoint in fake_backends.py) to load test without OpenAI.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_cache import get_answer_cache
+from http_server import HTTPError, Response, serve
+from ingest_jobs import IngestJobQueue
+from reranker import get_reranker
+from shared_resources import get_llm_handler, get_vectorstore_manager
+from symbol_index import merge_definitions
+from tracing import get_tracer
+from warmup import warmup
+
+
+class QueryService:
+    def __init__(self, parent_dir="./chroma_db", model="gpt-4o-mini", temperature=0.7, max_in_flight=32, fake=False):
+        if fake:
+            from embedding_cache import CachedQueryEmbeddings
+            from fake_backends import FakeChatModel, HashingEmbeddings
+            from llm_handler import LLMHandler
+            from vector_store import VectorStoreManager
+            self.vectorstore_manager = VectorStoreManager(parent_dir=parent_dir, embeddings=CachedQueryEmbeddings(HashingEmbeddings()))
+            self.llm_handler = LLMHandler(model="fake", temperature=temperature, llm=FakeChatModel())
+        else:
+            self.vectorstore_manager = get_vectorstore_manager(parent_dir)
+            self.llm_handler = get_llm_handler(model=model, temperature=temperature)
+        # Read-only view of the job table; ingestion itself runs in the Admin UI's workers
+        self.ingest_jobs = IngestJobQueue(self.vectorstore_manager)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="query-service")
+        self.routes = {
+            ("POST", "/query"): self.query,
+            ("POST", "/retrieve"): self.retrieve,
+            ("GET", "/ingest/status"): self.ingest_status,
+        }
+
+    async def handle(self, request):
+        if request.path == "/health":
+            return Response(200, {"status": "ok", "in_flight": self.in_flight, "rejected": self.rejected})
+        if request.path == "/metrics":
+            # Like /health, scrapes bypass the backpressure limit
+            if request.query_param("format") == "json":
+                return Response(200, get_tracer().snapshot())
+            return Response(200, get_tracer().prometheus(), content_type="text/plain; version=0.0.4")
+
+        route = self.routes.get((request.method, request.path))
+        if route is None:
+            raise HTTPError(404, f"No route for {request.method} {request.path}")
+
+        # Backpressure: the event loop is single-threaded, so the counter needs no lock
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPError(429, "Too many requests in flight.", headers={"Retry-After": "1"})
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return Response(200, await loop.run_in_executor(self.executor, self._run_route, route, request))
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _run_route(route, request):
+        # Root span of the request; the stage spans of the route become its children
+        with get_tracer().span("request", method=request.method, path=request.path):
+            return route(request)
+
+    def _get_vectorstore(self, payload):
+        db_name = payload.get("db")
+        if not db_name:
+            raise HTTPError(400, "Missing 'db'.")
+        vectorstore = self.vectorstore_manager.get_vectorstore(db_name)
+        if vectorstore is None:
+            raise HTTPError(404, f"Vectordb '{db_name}' does not exist.")
+        return db_name, vectorstore
+
+    @staticmethod
+    def _embed_query(vectorstore, query):
+        with get_tracer().span("embed", kind="query"):
+            return vectorstore.embeddings.embed_query(query)
+
+    def _lookup_symbols(self, db_name, query, payload):
+        """Definition chunks of the code symbols named in the query (see symbol_index.py), or []."""
+        if not payload.get("symbols", True):
+            return [], {}
+        start = time.perf_counter()
+        with get_tracer().span("symbol_lookup", db=db_name) as span:
+            docs = self.vectorstore_manager.find_symbol_definitions(db_name, query, limit=int(payload.get("top_m", 8)))
+            span.set(results=len(docs))
+        return docs, {"symbol_lookup_ms": (time.perf_counter() - start) * 1000}
+
+    def _retrieve(self, db_name, vectorstore, query, query_embedding, payload, symbol_docs=()):
+        timings = {}
+        tracer = get_tracer()
+        k = int(payload.get("k", 50))
+        start = time.perf_counter()
+        with tracer.span("retrieve", db=db_name, k=k) as span:
+            docs = vectorstore.similarity_search_by_vector(query_embedding, k=k)
+            span.set(results=len(docs))
+        timings["retrieve_ms"] = (time.perf_counter() - start) * 1000
+        # Definitions of ambiguous symbol names compete with the search results for the top_m slots
+        docs = merge_definitions(list(symbol_docs), docs)
+        top_m = int(payload.get("top_m", 8))
+        if payload.get("rerank", True):
+            with tracer.span("rerank", candidates=len(docs)):
+                docs, rerank_stats = get_reranker().rerank(query, docs, top_m=top_m)
+            timings["rerank_ms"] = rerank_stats["latency_ms"]
+        else:
+            # The prompt gets at most top_m chunks, with or without reranking
+            docs = docs[:top_m]
+        if payload.get("expand_parents", True):
+            docs = self.vectorstore_manager.expand_to_parents(db_name, docs)
+        return docs, timings
+
+    @staticmethod
+    def _serialize(docs):
+        return [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+    def retrieve(self, request):
+        payload = request.json()
+        query = payload.get("query")
+        if not query:
+            raise HTTPError(400, "Missing 'query'.")
+        db_name, vectorstore = self._get_vectorstore(payload)
+        symbol_docs, timings = self._lookup_symbols(db_name, query, payload)
+        docs = [doc for doc in symbol_docs if doc.metadata["symbol_exact"]]
+        if docs:
+            return {"documents": self._serialize(docs), "symbol_match": True, "timings": timings}
+        query_embedding = self._embed_query(vectorstore, query)
+        docs, retrieve_timings = self._retrieve(db_name, vectorstore, query, query_embedding, payload, symbol_docs)
+        return {"documents": self._serialize(docs), "symbol_match": False, "timings": {**timings, **retrieve_timings}}
+
+    def query(self, request):
+        payload = request.json()
+        question = payload.get("question")
+        if not question:
+            raise HTTPError(400, "Missing 'question'.")
+        db_name, vectorstore = self._get_vectorstore(payload)
+
+        start = time.perf_counter()
+        symbol_docs, timings = self._lookup_symbols(db_name, question, payload)
+        docs = [doc for doc in symbol_docs if doc.metadata["symbol_exact"]]
+        query_embedding = None
+        if not docs:
+            query_embedding = self._embed_query(vectorstore, question)
+        answer_cache = get_answer_cache()
+        namespace = (self.vectorstore_manager.get_db_path(db_name), self.llm_handler.model)
+        db_version = self.vectorstore_manager.get_db_version(db_name)
+        if query_embedding is not None:
+            cached = answer_cache.lookup(namespace, query_embedding, db_version)
+            if cached is not None:
+                answer, similarity = cached
+                return {"answer": answer, "sources": [], "cached": True, "similarity": similarity,
+                        "timings": {"total_ms": (time.perf_counter() - start) * 1000}}
+            docs, retrieve_timings = self._retrieve(db_name, vectorstore, question, query_embedding, payload, symbol_docs)
+            timings.update(retrieve_timings)
+        llm_start = time.perf_counter()
+        answer = self.llm_handler.answer(question, docs)
+        timings["llm_ms"] = (time.perf_counter() - llm_start) * 1000
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        if query_embedding is not None:
+            answer_cache.store(namespace, question, query_embedding, answer, db_version)
+        return {
+            "answer": answer,
+            "sources": sorted({doc.metadata.get("source", "Unknown Source") for doc in docs}),
+            "symbols": sorted({doc.metadata["symbol"] for doc in docs if "symbol" in doc.metadata}),
+            "cached": False,
+            "timings": timings,
+        }
+
+    def ingest_status(self, request):
+        db_name = request.query_param("db")
+        db_names = [db_name] if db_name else self.vectorstore_manager.list_vectordbs()
+        vectordbs = []
+        for name in db_names:
+            vectorstore = self.vectorstore_manager.get_vectorstore(name)
+            if vectorstore is None:
+                raise HTTPError(404, f"Vectordb '{name}' does not exist.")
+            vectordbs.append({
+                "name": name,
+                "chunks": vectorstore._collection.count(),
+                "catalog": self.vectorstore_manager.get_catalog(name).totals(),
+                "symbols": self.vectorstore_manager.get_symbol_index(name).totals(),
+                "version": self.vectorstore_manager.get_db_version(name),
+                "jobs": self.ingest_jobs.list_jobs(name, limit=10),
+            })
+        return {"vectordbs": vectordbs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless query service for the wiki vectordbs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--parent-dir", default="./chroma_db", help="Parent directory of the vectordbs.")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--max-in-flight", type=int, default=32, help="Requests beyond this limit get a 429.")
+    parser.add_argument("--fake", action="store_true", help="Use in-process fake embeddings and LLM.")
+    parser.add_argument("--no-warmup", action="store_true", help="Do not pre-open the vectordbs before listening.")
+    args = parser.parse_args()
+
+    service = QueryService(args.parent_dir, args.model, args.temperature, args.max_in_flight, args.fake)
+    if not args.no_warmup:
+        timings = warmup(vectorstore_manager=service.vectorstore_manager, llm_handler=service.llm_handler)
+        print(f"Warmed up in {timings['total']:.2f} s")
+    print(f"Query service listening on http://{args.host}:{args.port}")
+    asyncio.run(serve(service.handle, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
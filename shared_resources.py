@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+class SharedResourceCache:
+    """
+    Thread-safe, process-wide registry of expensive resources (vectorstore managers,
+    Chroma collections, LLM clients) keyed by explicit tuples such as
+    ("llm", model, temperature).
+
+    Every Streamlit session asking for the same key gets the same instance, so memory
+    grows with the number of distinct databases and model settings rather than with
+    the number of users. Entries are evicted in LRU order once `max_entries` is reached
+    and when they have not been used for `idle_ttl_seconds`.
+    """
+    def __init__(self, max_entries: int = 64, idle_ttl_seconds: float = None):
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries = OrderedDict()  # key -> [value, last_used]
+        self._creation_locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """Returns the resource for key, building it with factory() exactly once if missing."""
+        with self._lock:
+            value = self._touch(key)
+            if value is not None:
+                return value
+            creation_lock = self._creation_locks.setdefault(key, threading.Lock())
+
+        # Build outside the registry lock so slow factories do not block other keys
+        with creation_lock:
+            with self._lock:
+                value = self._touch(key)
+                if value is not None:
+                    return value
+            value = factory()
+            with self._lock:
+                if value is not None:
+                    self._entries[key] = [value, time.monotonic()]
+                self._creation_locks.pop(key, None)
+                self._evict_expired()
+            return value
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[1] = time.monotonic()
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _evict_expired(self):
+        if self.idle_ttl_seconds is not None:
+            now = time.monotonic()
+            for key in [key for key, (_, last_used) in self._entries.items() if now - last_used > self.idle_ttl_seconds]:
+                del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, predicate=None):
+        """Removes all entries, or the entries whose key matches predicate(key)."""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._entries)
+
+
+shared_resources = SharedResourceCache(
+    max_entries=int(os.getenv("SHARED_RESOURCES_MAX_ENTRIES", "64")),
+    idle_ttl_seconds=float(os.getenv("SHARED_RESOURCES_IDLE_TTL_SECONDS", "3600")),
+)
+
+
+def get_vectorstore_manager(parent_dir: str):
+    """Returns the shared VectorStoreManager for a parent directory."""
+    # Imported here because vector_store itself caches its Chroma collections in this module
+    from vector_store import VectorStoreManager
+    return shared_resources.get_or_create(
+        ("vectorstore_manager", os.path.abspath(parent_dir)),
+        lambda: VectorStoreManager(parent_dir=parent_dir),
+    )
+
+
+def get_llm_handler(model: str = "gpt-4o-mini", temperature: float = 0.7):
+    """Returns the shared LLMHandler for a model and temperature."""
+    from llm_handler import LLMHandler
+    return shared_resources.get_or_create(
+        ("llm_handler", model, float(temperature)),
+        lambda: LLMHandler(model=model, temperature=temperature),
+    )
@@ -0,0 +1,200 @@
+import os
+import time
+import sqlite3
+import hashlib
+from contextlib import closing
+
+from sqlite_sidecar import SQLiteSidecar
+
+from token_counter import count_tokens
+
+CATALOG_FILENAME = "catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    token_count INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    file_size INTEGER,
+    file_mtime REAL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceCatalog(SQLiteSidecar):
+    """
+    SQLite sidecar index of the chunks in a vectordb, grouped by source file.
+
+    VectorStoreManager keeps it in sync on every add and delete, so listing sources,
+    counting chunks, finding stale files and resolving a source's chunk ids are
+    indexed lookups instead of scans over the Chroma collection. A catalog created
+    next to an existing vectordb is incomplete until it was rebuilt once from the
+    collection (see VectorStoreManager.rebuild_catalog).
+    """
+    SCHEMA = _SCHEMA
+    TABLES = ("chunks", "sources", "meta")
+
+    def is_complete(self) -> bool:
+        """True if the catalog covers every chunk of the vectordb."""
+        if not os.path.exists(self.path):
+            return False
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def mark_complete(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+
+    def add_chunks(self, documents: list):
+        """Records chunks (with their vectorstore id in metadata['id']) and updates their sources."""
+        rows = [
+            (doc.metadata["id"], doc.metadata.get("source") or "", count_tokens(doc.page_content))
+            for doc in documents
+        ]
+        sources = {row[1] for row in rows}
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO chunks (id, source, tokens) VALUES (?, ?, ?)", rows)
+            for source in sources:
+                content_hash, size, mtime = self._file_info(conn, source)
+                conn.execute(
+                    "INSERT INTO sources (source, content_hash, file_size, file_mtime, ingested_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (source) DO UPDATE SET content_hash = excluded.content_hash, "
+                    "file_size = excluded.file_size, file_mtime = excluded.file_mtime, ingested_at = excluded.ingested_at",
+                    (source, content_hash, size, mtime, now)
+                )
+            self._refresh_counts(conn, sources)
+
+    @staticmethod
+    def _file_info(conn, source):
+        """
+        Hash, size and mtime of a source file. A file is added in several batches, so the
+        hash recorded by an earlier batch is reused while the file's size and mtime match.
+        """
+        if not source or not os.path.isfile(source):
+            return None, None, None
+        stat = os.stat(source)
+        row = conn.execute(
+            "SELECT content_hash, file_size, file_mtime FROM sources WHERE source = ?", (source,)
+        ).fetchone()
+        if row and row[0] and row[1] == stat.st_size and row[2] == stat.st_mtime:
+            return row[0], stat.st_size, stat.st_mtime
+        return file_hash(source), stat.st_size, stat.st_mtime
+
+    def _refresh_counts(self, conn, sources):
+        for source in sources:
+            chunk_count, token_count = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM chunks WHERE source = ?", (source,)
+            ).fetchone()
+            if chunk_count:
+                conn.execute("UPDATE sources SET chunk_count = ?, token_count = ? WHERE source = ?",
+                             (chunk_count, token_count, source))
+            else:
+                conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+
+    def chunk_ids(self, sources: list) -> list:
+        """Returns the ids of all chunks of the given sources."""
+        if not sources or not os.path.exists(self.path):
+            return []
+        ids = []
+        with closing(self._connect()) as conn:
+            for source in sources:
+                ids.extend(row[0] for row in conn.execute("SELECT id FROM chunks WHERE source = ?", (source,)))
+        return ids
+
+    def delete_ids(self, ids: list):
+        if not ids or not os.path.exists(self.path):
+            return
+        with closing(self._connect()) as conn, conn:
+            sources = set()
+            for chunk_id in ids:
+                row = conn.execute("SELECT source FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+                if row:
+                    sources.add(row[0])
+                    conn.execute("DELETE FROM chunks WHERE id = ?", (chunk_id,))
+            self._refresh_counts(conn, sources)
+
+    def delete_sources(self, sources: list):
+        if not sources or not os.path.exists(self.path):
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM chunks WHERE source = ?", [(source,) for source in sources])
+            conn.executemany("DELETE FROM sources WHERE source = ?", [(source,) for source in sources])
+
+    def list_sources(self, prefix: str = None, limit: int = None, offset: int = 0) -> list:
+        """
+        Returns the catalogued sources ordered by path, optionally only those below a path prefix.
+
+        Returns:
+        - sources (list): dicts with source, chunk_count, token_count, content_hash, file_size,
+          file_mtime and ingested_at.
+        """
+        if not os.path.exists(self.path):
+            return []
+        query = "SELECT * FROM sources"
+        params = []
+        if prefix:
+            # Range scan on the primary key instead of LIKE, which would not use the index
+            query += " WHERE source >= ? AND source < ?"
+            params += [prefix, prefix + "\U0010ffff"]
+        query += " ORDER BY source LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset]
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def totals(self) -> dict:
+        """Returns the number of sources, chunks and tokens."""
+        if not os.path.exists(self.path):
+            return {"sources": 0, "chunks": 0, "tokens": 0}
+        with closing(self._connect()) as conn:
+            sources, chunks, tokens = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunk_count), 0), COALESCE(SUM(token_count), 0) FROM sources"
+            ).fetchone()
+        return {"sources": sources, "chunks": chunks, "tokens": tokens}
+
+    def find_stale(self, check_hash: bool = False) -> list:
+        """
+        Returns the sources whose file was deleted or changed since it was ingested.
+        A file counts as changed if its size or mtime differ; with check_hash, files whose
+        content is unchanged (e.g. only touched) are not reported.
+
+        Returns:
+        - stale (list): (source, reason) tuples with reason "deleted" or "modified".
+        """
+        stale = []
+        for row in self.list_sources():
+            source = row["source"]
+            if row["file_mtime"] is None:
+                continue  # Not ingested from a local file (e.g. the table of contents)
+            if not os.path.isfile(source):
+                stale.append((source, "deleted"))
+                continue
+            stat = os.stat(source)
+            if stat.st_size == row["file_size"] and stat.st_mtime == row["file_mtime"]:
+                continue
+            if check_hash and file_hash(source) == row["content_hash"]:
+                continue
+            stale.append((source, "modified"))
+        return stale
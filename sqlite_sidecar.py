@@ -0,0 +1,29 @@
+import sqlite3
+from contextlib import closing
+
+
+class SQLiteSidecar:
+    """
+    Base class of the SQLite files stored next to a vectordb's Chroma collection (source
+    catalog, parent store, symbol index). Subclasses set SCHEMA, created on the first
+    connection, and TABLES, which reset() empties.
+    """
+    SCHEMA = ""
+    TABLES = ()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.executescript(self.SCHEMA)
+            self._initialized = True
+        return conn
+
+    def reset(self):
+        """Removes all entries, e.g. before a rebuild."""
+        with closing(self._connect()) as conn, conn:
+            for table in self.TABLES:
+                conn.execute(f"DELETE FROM {table}")
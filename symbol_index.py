@@ -0,0 +1,224 @@
+import os
+import re
+import ast
+import sqlite3
+import textwrap
+from contextlib import closing
+
+from sqlite_sidecar import SQLiteSidecar
+
+SYMBOL_INDEX_FILENAME = "symbols.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    name TEXT NOT NULL,
+    qualified_name TEXT NOT NULL,
+    short_name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    start_line INTEGER,
+    end_line INTEGER,
+    UNIQUE (qualified_name, chunk_id)
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_qualified_name ON symbols (qualified_name);
+CREATE INDEX IF NOT EXISTS symbols_short_name ON symbols (short_name);
+CREATE INDEX IF NOT EXISTS symbols_chunk ON symbols (chunk_id);
+CREATE INDEX IF NOT EXISTS symbols_source ON symbols (source);
+CREATE TABLE IF NOT EXISTS symbol_references (
+    name TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS symbol_references_name ON symbol_references (name);
+CREATE INDEX IF NOT EXISTS symbol_references_chunk ON symbol_references (chunk_id);
+CREATE INDEX IF NOT EXISTS symbol_references_source ON symbol_references (source);
+"""
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def symbol_candidates(query: str) -> list:
+    """
+    Returns the identifiers in a query that look like code symbols: names in backticks,
+    dotted names, snake_case, CamelCase and names followed by "()". Plain words are
+    ignored, so ordinary questions do not hit the index by accident.
+    """
+    candidates = []
+    for quoted in re.findall(r"`([^`]+)`", query):
+        candidates.extend(match.group(0) for match in _IDENTIFIER.finditer(quoted))
+    for match in _IDENTIFIER.finditer(query):
+        name = match.group(0)
+        followed_by_call = query[match.end():match.end() + 2] == "()"
+        if "." in name.strip(".") or "_" in name.strip("_") or followed_by_call or re.search(r"[a-z][A-Z]", name):
+            candidates.append(name)
+    return list(dict.fromkeys(candidate.strip(".") for candidate in candidates))
+
+
+def merge_definitions(definitions: list, documents: list) -> list:
+    """
+    Puts the definition chunks of ambiguous symbol matches ahead of the similarity search
+    results, without duplicates, so that reranking (or trimming to the top M) can weigh
+    them against each other.
+    """
+    merged, seen = [], set()
+    for doc in [*definitions, *documents]:
+        key = doc.metadata.get("id") or id(doc)
+        if key not in seen:
+            seen.add(key)
+            merged.append(doc)
+    return merged
+
+
+def _references(text: str, first_line: int) -> list:
+    """Returns (name, line) of the calls in a chunk of Python code; empty if it does not parse on its own."""
+    try:
+        tree = ast.parse(textwrap.dedent(text))
+    except SyntaxError:
+        return []
+    references = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        if isinstance(func, ast.Name):
+            name = func.id
+        elif isinstance(func, ast.Attribute):
+            name = func.attr
+        else:
+            continue
+        references.append((name, first_line + node.lineno - 1))
+    return references
+
+
+class SymbolIndex(SQLiteSidecar):
+    """
+    SQLite sidecar index of the Python symbols of a vectordb.
+
+    Maps the functions, classes and methods found by the AST chunker (pyhton_chunker.py)
+    to the chunk that defines them, and records call sites as cheap references. Lookups
+    by name are indexed queries, so a question that names a symbol can be answered from
+    its definition chunk without an embedding call, as long as the name is unambiguous.
+    VectorStoreManager keeps it in sync on every add and delete and rebuilds it together
+    with the source catalog.
+    """
+    SCHEMA = _SCHEMA
+    TABLES = ("symbols", "symbol_references")
+
+    def add_chunks(self, documents: list):
+        """Records the symbols and call sites of Python chunks; other documents are ignored."""
+        symbols, references, chunk_ids = [], [], []
+        for doc in documents:
+            metadata = doc.metadata
+            kind = metadata.get("python_chunk_type")
+            if not kind:
+                continue
+            chunk_id = metadata["id"]
+            source = metadata.get("source") or ""
+            module = os.path.splitext(os.path.basename(source))[0]
+            start_line = metadata.get("start_line")
+            first_line = start_line + 1 if start_line is not None else 1
+            chunk_ids.append(chunk_id)
+
+            if kind in ("function", "class_method", "class"):
+                name = metadata["python_chunk_name"]
+                symbols.append((name, f"{module}.{name}", name.rsplit(".", 1)[-1], kind,
+                                chunk_id, source, first_line, metadata.get("end_line")))
+            class_name = metadata.get("class_name")
+            if kind == "class_method" and class_name:
+                # The class itself resolves to its parent section, or to its method chunks
+                class_start = metadata.get("class_start_line")
+                symbols.append((class_name, f"{module}.{class_name}", class_name, "class",
+                                metadata.get("parent_id") or chunk_id, source,
+                                class_start + 1 if class_start is not None else None, metadata.get("class_end_line")))
+            if kind != "class":  # A class parent repeats the code of its method chunks
+                references.extend((name, chunk_id, source, line) for name, line in _references(doc.page_content, first_line))
+
+        if not chunk_ids:
+            return
+        with closing(self._connect()) as conn, conn:
+            self._delete_chunks(conn, chunk_ids)
+            conn.executemany("INSERT OR IGNORE INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", symbols)
+            conn.executemany("INSERT INTO symbol_references VALUES (?, ?, ?, ?)", references)
+
+    @staticmethod
+    def _delete_chunks(conn, chunk_ids: list):
+        rows = [(chunk_id,) for chunk_id in chunk_ids]
+        conn.executemany("DELETE FROM symbols WHERE chunk_id = ?", rows)
+        conn.executemany("DELETE FROM symbol_references WHERE chunk_id = ?", rows)
+
+    def lookup(self, names: list, limit: int = 8) -> list:
+        """
+        Returns the definitions of the given names. A name matches a symbol's name
+        ("Class.method"), its module-qualified name ("module.Class.method") or, if nothing
+        matches exactly, its unqualified last part ("method"). A match is exact if the name
+        matches the name or qualified name of a single symbol in a single file; a name defined
+        in several files (e.g. `main`, or `utils.helper` in two `utils.py`) or matched only by
+        its last part is not.
+
+        Returns:
+        - definitions (list): dicts with name, qualified_name, kind, chunk_id, source,
+          start_line, end_line (1-based, inclusive) and exact.
+        """
+        if not names or not os.path.exists(self.path):
+            return []
+        definitions = []
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            for name in names:
+                rows = conn.execute(
+                    "SELECT name, qualified_name, kind, chunk_id, source, start_line, end_line FROM symbols "
+                    "WHERE name = ? OR qualified_name = ? ORDER BY source, start_line LIMIT ?", (name, name, limit)
+                ).fetchall()
+                # A class is indexed once per method chunk, so one symbol can have several rows. The
+                # module part is only the file name, so `utils.helper` in a/ and b/ are two symbols.
+                exact = len({(row["qualified_name"], row["source"]) for row in rows}) == 1
+                if not rows and "." not in name:
+                    rows = conn.execute(
+                        "SELECT name, qualified_name, kind, chunk_id, source, start_line, end_line FROM symbols "
+                        "WHERE short_name = ? ORDER BY source, start_line LIMIT ?", (name, limit)
+                    ).fetchall()
+                definitions.extend({**dict(row), "exact": exact} for row in rows)
+        return definitions[:limit]
+
+    def references(self, name: str, limit: int = 50) -> list:
+        """
+        Returns the call sites of a symbol, matched by its unqualified name (so calls of
+        equally named methods of other classes are included).
+
+        Returns:
+        - references (list): dicts with name, chunk_id, source and line.
+        """
+        if not os.path.exists(self.path):
+            return []
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(
+                "SELECT name, chunk_id, source, line FROM symbol_references WHERE name = ? "
+                "ORDER BY source, line LIMIT ?", (name.rsplit(".", 1)[-1], limit)
+            )]
+
+    def delete_ids(self, ids: list):
+        if not ids or not os.path.exists(self.path):
+            return
+        with closing(self._connect()) as conn, conn:
+            self._delete_chunks(conn, ids)
+
+    def delete_sources(self, sources: list):
+        if not sources or not os.path.exists(self.path):
+            return
+        rows = [(source,) for source in sources]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM symbols WHERE source = ?", rows)
+            conn.executemany("DELETE FROM symbol_references WHERE source = ?", rows)
+
+    def totals(self) -> dict:
+        """Returns the number of symbols and references."""
+        if not os.path.exists(self.path):
+            return {"symbols": 0, "references": 0}
+        with closing(self._connect()) as conn:
+            symbols = conn.execute("SELECT COUNT(DISTINCT qualified_name) FROM symbols").fetchone()[0]
+            references = conn.execute("SELECT COUNT(*) FROM symbol_references").fetchone()[0]
+        return {"symbols": symbols, "references": references}
@@ -0,0 +1,10 @@
+import pytest
+
+from fake_backends import HashingEmbeddings
+from vector_store import VectorStoreManager
+
+
+@pytest.fixture
+def vsm(tmp_path):
+    """A VectorStoreManager on a temporary parent dir, with deterministic local embeddings."""
+    return VectorStoreManager(parent_dir=str(tmp_path / "chroma_db"), embeddings=HashingEmbeddings())
@@ -0,0 +1,95 @@
+import gzip
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+from chunk_journal import ChunkJournal
+
+
+def _chunk(chunk_id, source="doc.md", text=None):
+    return Document(page_content=text or f"text of {chunk_id}", metadata={"id": chunk_id, "source": source})
+
+
+def _live_ids(journal):
+    return [record["id"] for record in journal.iter_live_chunks()]
+
+
+def test_replay_applies_id_and_source_tombstones(tmp_path):
+    journal = ChunkJournal(str(tmp_path / "chunks.jsonl.gz"))
+    journal.append_chunks([_chunk("a"), _chunk("b"), _chunk("c", source="other.md")])
+    journal.append_deletes(ids=["a"])
+    journal.append_deletes(sources=["other.md"])
+    journal.append_chunks([_chunk("c", source="other.md", text="re-added")])
+
+    assert _live_ids(journal) == ["b", "c"]
+    assert [record["text"] for record in journal.iter_live_chunks()][-1] == "re-added"
+
+
+def test_torn_append_at_the_end_is_ignored(tmp_path):
+    journal = ChunkJournal(str(tmp_path / "chunks.jsonl.gz"))
+    journal.append_chunks([_chunk("a"), _chunk("b")])
+    member = gzip.compress(json.dumps({"op": "add", "id": "c", "source": "doc.md", "metadata": {}, "text": "c"}).encode())
+    with open(journal.path, "ab") as f:
+        f.write(member[:len(member) // 2])  # A crash in the middle of an append
+
+    assert _live_ids(journal) == ["a", "b"]
+
+
+def test_records_after_a_corrupt_member_stay_readable(tmp_path):
+    journal = ChunkJournal(str(tmp_path / "chunks.jsonl.gz"))
+    journal.append_chunks([_chunk("a")])
+    member = gzip.compress(b'{"op": "add", "id": "lost"}\n')
+    with open(journal.path, "ab") as f:
+        f.write(member[:12])  # Torn header and payload, followed by later appends
+    journal.append_chunks([_chunk("b")])
+    journal.append_chunks([_chunk("c")])
+
+    assert _live_ids(journal) == ["a", "b", "c"]
+
+
+def test_compact_keeps_only_live_chunks(tmp_path):
+    journal = ChunkJournal(str(tmp_path / "chunks.jsonl.gz"))
+    journal.append_chunks([_chunk("a"), _chunk("b")])
+    journal.append_deletes(ids=["a"])
+
+    assert journal.compact() == 1
+    assert [record["op"] for record in journal.iter_records()] == ["add"]
+    assert _live_ids(journal) == ["b"]
+
+
+def test_rebuild_from_journal_into_a_new_vectordb(vsm):
+    vsm.create_vectordb("source")
+    assert vsm.add_documents("source", [_chunk("a"), _chunk("b"), _chunk("c", source="other.md")], delay=0)
+    assert vsm.delete_documents_by_source("source", ["other.md"])
+
+    count = vsm.rebuild_from_journal("target", vsm.get_journal("source").path)
+
+    assert count == 2
+    assert sorted(doc["metadata"]["id"] for doc in vsm.list_documents("target")) == ["a", "b"]
+    assert vsm.get_catalog("target").is_complete()
+    assert vsm.get_catalog("target").totals()["chunks"] == 2
+
+
+def test_rebuild_from_journal_replaces_an_existing_vectordb(vsm):
+    vsm.create_vectordb("source")
+    assert vsm.add_documents("source", [_chunk("a")], delay=0)
+    vsm.create_vectordb("target")
+    python_chunk = Document(page_content="def stale():\n    pass\n", metadata={
+        "id": "stale", "source": "stale.py", "python_chunk_type": "function", "python_chunk_name": "stale", "start_line": 0,
+    })
+    assert vsm.add_documents("target", [python_chunk], delay=0)
+    assert vsm.get_symbol_index("target").totals()["symbols"] == 1
+
+    vsm.rebuild_from_journal("target", vsm.get_journal("source").path)
+
+    assert [doc["metadata"]["id"] for doc in vsm.list_documents("target")] == ["a"]
+    assert vsm.get_symbol_index("target").totals() == {"symbols": 0, "references": 0}
+    assert [row["source"] for row in vsm.get_catalog("target").list_sources()] == ["doc.md"]
+    assert _live_ids(vsm.get_journal("target")) == ["a"]
+
+
+def test_rebuild_from_its_own_journal_is_rejected(vsm):
+    vsm.create_vectordb("wiki")
+    with pytest.raises(ValueError):
+        vsm.rebuild_from_journal("wiki", vsm.get_journal("wiki").path)
@@ -0,0 +1,70 @@
+import pytest
+
+git = pytest.importorskip("git")
+
+from document_processor import DocumentProcessor
+
+
+def _commit(repo, files, message):
+    for relative_path, text in files.items():
+        path = repo.working_tree_dir + "/" + relative_path
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    repo.index.add(list(files))
+    repo.index.commit(message)
+
+
+@pytest.fixture
+def wiki_repo(tmp_path):
+    repo = git.Repo.init(tmp_path / "wiki")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test")
+        config.set_value("user", "email", "test@example.com")
+    _commit(repo, {"Übersicht.md": "# Übersicht\n\nEinführung in das Wiki.\n", "Home.md": "# Home\n\nStart page.\n"}, "init")
+    return repo
+
+
+def _sources(vsm, db_name):
+    return sorted(row["source"] for row in vsm.get_catalog(db_name).list_sources())
+
+
+def test_full_sync_includes_non_ascii_paths(vsm, wiki_repo):
+    vsm.create_vectordb("wiki")
+    processor = DocumentProcessor(vsm, llm=None)
+
+    summary = processor.sync_git_repository("wiki", wiki_repo.working_tree_dir, ["md"], delay=0)
+
+    assert summary["mode"] == "full"
+    assert summary["files_loaded"] == 2
+    assert not summary["failed_files"]
+    assert any(source.endswith("Übersicht.md") for source in _sources(vsm, "wiki"))
+
+
+def test_incremental_sync_replaces_modified_non_ascii_file(vsm, wiki_repo):
+    vsm.create_vectordb("wiki")
+    processor = DocumentProcessor(vsm, llm=None)
+    processor.sync_git_repository("wiki", wiki_repo.working_tree_dir, ["md"], delay=0)
+    chunks_before = vsm.get_catalog("wiki").totals()["chunks"]
+
+    _commit(wiki_repo, {"Übersicht.md": "# Übersicht\n\nÜberarbeitete Einführung.\n"}, "edit")
+    summary = processor.sync_git_repository("wiki", wiki_repo.working_tree_dir, ["md"], delay=0)
+
+    assert summary["mode"] == "incremental"
+    assert summary["modified"] == 1
+    assert vsm.get_catalog("wiki").totals()["chunks"] == chunks_before
+    texts = [doc["content"] for doc in vsm.list_documents("wiki")]
+    assert any("Überarbeitete" in text for text in texts)
+    assert not any("Einführung in das Wiki" in text for text in texts)
+
+
+def test_rerun_does_not_duplicate_chunks(vsm, wiki_repo):
+    vsm.create_vectordb("wiki")
+    processor = DocumentProcessor(vsm, llm=None)
+    processor.sync_git_repository("wiki", wiki_repo.working_tree_dir, ["md"], delay=0)
+    chunks = vsm.get_catalog("wiki").totals()["chunks"]
+
+    # A sync interrupted before recording its commit is redone from the same diff
+    processor._save_sync_state("wiki", {})
+    processor.sync_git_repository("wiki", wiki_repo.working_tree_dir, ["md"], delay=0)
+
+    assert vsm.get_catalog("wiki").totals()["chunks"] == chunks
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from document_processor import DocumentProcessor
+from ingest_jobs import IngestJobQueue
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    for name in ("a", "b", "c"):
+        (directory / f"{name}.md").write_text(f"# {name}\n\ncontent of {name}\n", encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def queue(vsm):
+    vsm.create_vectordb("docs")
+    queue = IngestJobQueue(vsm, max_workers=1)
+    yield queue
+    queue.stop()
+
+
+def _wait_for_status(queue, job_id, statuses, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} is still {queue.get_job(job_id)['status']}")
+
+
+def test_queued_job_is_cancelled_immediately(queue, docs_dir):
+    job_id = queue.submit("docs", str(docs_dir), ["md"], delay=0)
+
+    assert queue.cancel(job_id)
+    assert queue.get_job(job_id)["status"] == "cancelled"
+    assert not queue.cancel(job_id)
+
+
+def test_cancelled_job_resumes_without_redoing_files(queue, vsm, docs_dir, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    loaded = []
+    load_file = DocumentProcessor.load_file
+
+    def blocking_load_file(self, file_path, text_splitter):
+        loaded.append(file_path)
+        if len(loaded) == 1:
+            started.set()
+            release.wait(10)
+        return load_file(self, file_path, text_splitter)
+
+    monkeypatch.setattr(DocumentProcessor, "load_file", blocking_load_file)
+    job_id = queue.submit("docs", str(docs_dir), ["md"], delay=0)
+    queue.start()
+    assert started.wait(10)
+
+    # A running job stops after its current file
+    assert queue.cancel(job_id)
+    release.set()
+    job = _wait_for_status(queue, job_id, ("cancelled",))
+    assert job["files_done"] == 1
+
+    assert queue.resume(job_id)
+    job = _wait_for_status(queue, job_id, ("done",))
+    assert job["files_done"] == job["files_total"] == 3
+    assert sorted(loaded) == sorted(set(loaded))
+    assert vsm.get_catalog("docs").totals()["sources"] == 3
+    assert not queue.resume(job_id)
+
+
+def test_failed_files_are_recorded_and_retried_on_resume(queue, vsm, docs_dir, monkeypatch):
+    load_file = DocumentProcessor.load_file
+    broken = {str(docs_dir / "b.md")}
+
+    def failing_load_file(self, file_path, text_splitter):
+        if file_path in broken:
+            raise ValueError("unparsable")
+        return load_file(self, file_path, text_splitter)
+
+    monkeypatch.setattr(DocumentProcessor, "load_file", failing_load_file)
+    job_id = queue.submit("docs", str(docs_dir), ["md"], delay=0)
+    queue.start()
+    job = _wait_for_status(queue, job_id, ("done",))
+    assert job["files_failed"] == 1
+    assert "b.md: unparsable" in job["error"]
+    assert queue.list_failed_files(job_id) == [(str(docs_dir / "b.md"), "unparsable")]
+
+    broken.clear()
+    assert queue.resume(job_id)
+    job = _wait_for_status(queue, job_id, ("done",))
+    assert job["files_failed"] == 0
+    assert job["error"] is None
+    assert job["files_done"] == 3
+    assert vsm.get_catalog("docs").totals()["sources"] == 3
+
+
+def test_missing_directory_fails_the_job(queue, tmp_path):
+    job_id = queue.submit("docs", str(tmp_path / "missing"), ["md"], delay=0)
+    queue.start()
+    job = _wait_for_status(queue, job_id, ("failed",))
+    assert "not found" in job["error"]
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from langchain_core.documents import Document
+
+from http_server import _handle_connection
+from service import QueryService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = QueryService(parent_dir=str(tmp_path / "chroma_db"), max_in_flight=1, fake=True)
+    vsm = service.vectorstore_manager
+    vsm.create_vectordb("wiki")
+    assert vsm.add_documents("wiki", [
+        Document(page_content="Deploy with the release pipeline.", metadata={"id": "deploy", "source": "deploy.md"}),
+        Document(page_content="Rotate the storage keys every month.", metadata={"id": "keys", "source": "keys.md"}),
+    ], delay=0)
+    yield service
+    service.executor.shutdown(wait=False)
+
+
+async def _exchange(port, raw: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(body) if body else None
+
+
+def _post(path, payload) -> bytes:
+    body = json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def _run(service, scenario):
+    async def main():
+        server = await asyncio.start_server(lambda r, w: _handle_connection(r, w, service.handle), "127.0.0.1", 0)
+        async with server:
+            return await scenario(server.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+def test_query_answers_from_the_vectordb(service):
+    status, _, body = _run(service, lambda port: _exchange(port, _post("/query", {"db": "wiki", "question": "How do I deploy?"})))
+    assert status == 200
+    assert body["answer"]
+    assert body["cached"] is False
+    assert "deploy.md" in body["sources"]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length_is_rejected_with_400(service, length):
+    raw = f"POST /query HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n".encode()
+    status, _, body = _run(service, lambda port: _exchange(port, raw))
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_unknown_db_is_404_and_missing_question_is_400(service):
+    async def scenario(port):
+        return (await _exchange(port, _post("/query", {"db": "missing", "question": "?"})),
+                await _exchange(port, _post("/query", {"db": "wiki"})))
+    (missing_status, _, _), (invalid_status, _, _) = _run(service, scenario)
+    assert missing_status == 404
+    assert invalid_status == 400
+
+
+def test_requests_beyond_max_in_flight_get_429(service, monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+    answer = service.llm_handler.answer
+
+    def blocking_answer(question, docs):
+        entered.set()
+        release.wait(10)
+        return answer(question, docs)
+
+    monkeypatch.setattr(service.llm_handler, "answer", blocking_answer)
+
+    async def scenario(port):
+        loop = asyncio.get_running_loop()
+        first = asyncio.create_task(_exchange(port, _post("/query", {"db": "wiki", "question": "How do I deploy?"})))
+        assert await loop.run_in_executor(None, entered.wait, 10)
+        rejected = await _exchange(port, _post("/query", {"db": "wiki", "question": "Which keys rotate?"}))
+        health = await _exchange(port, b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+        release.set()
+        return await first, rejected, health
+
+    first, rejected, health = _run(service, scenario)
+    assert first[0] == 200
+    assert rejected[0] == 429
+    assert rejected[1]["Retry-After"] == "1"
+    # Health checks bypass the limit and report the rejection
+    assert health[0] == 200
+    assert health[2]["in_flight"] == 1
+    assert health[2]["rejected"] == 1
+    assert service.in_flight == 0
@@ -0,0 +1,84 @@
+import pytest
+
+from document_processor import DocumentProcessor
+from symbol_index import SymbolIndex, merge_definitions, symbol_candidates
+
+
+@pytest.fixture
+def code_db(vsm, tmp_path):
+    files = {
+        "a/script.py": "def main():\n    print('a')\n",
+        "b/script.py": "def main():\n    print('b')\n",
+        "a/utils.py": "def helper():\n    return 1\n",
+        "b/utils.py": "def helper():\n    return 2\n",
+        "loader.py": (
+            "class Loader:\n"
+            "    def load_file(self, path):\n"
+            "        return open(path).read()\n"
+            "\n"
+            "    def close(self):\n"
+            "        return None\n"
+            "\n"
+            "def unique_helper():\n"
+            "    return main()\n"
+        ),
+    }
+    vsm.create_vectordb("code")
+    processor = DocumentProcessor(vsm, llm=None)
+    splitter = processor.get_text_splitter("Recursive", 500, 50)
+    for relative_path, text in files.items():
+        path = tmp_path / "src" / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        assert vsm.add_documents("code", processor.load_file(str(path), splitter), delay=0)
+    return vsm
+
+
+def _matches(vsm, query):
+    return [(doc.metadata["symbol"], doc.metadata["symbol_exact"]) for doc in vsm.find_symbol_definitions("code", query)]
+
+
+def test_symbol_candidates_ignore_plain_words():
+    assert symbol_candidates("how does the loader read a file") == []
+    assert symbol_candidates("what does `Loader.load_file` do with load_file() and LoaderFactory") == [
+        "Loader.load_file", "load_file", "LoaderFactory"
+    ]
+
+
+def test_unique_function_is_exact(code_db):
+    assert _matches(code_db, "where is unique_helper defined") == [("loader.unique_helper", True)]
+
+
+def test_qualified_method_is_exact(code_db):
+    assert _matches(code_db, "explain `Loader.load_file`") == [("loader.Loader.load_file", True)]
+
+
+def test_method_name_alone_is_ambiguous(code_db):
+    assert _matches(code_db, "what does load_file() do") == [("loader.Loader.load_file", False)]
+
+
+def test_name_defined_in_several_files_is_ambiguous(code_db):
+    assert _matches(code_db, "what does main() do") == [("script.main", False), ("script.main", False)]
+
+
+def test_same_module_name_in_two_directories_is_ambiguous(code_db):
+    matches = _matches(code_db, "what does `utils.helper` return")
+    assert matches == [("utils.helper", False), ("utils.helper", False)]
+
+
+def test_deleting_a_source_removes_its_symbols(code_db, tmp_path):
+    code_db.delete_documents_by_source("code", [str(tmp_path / "src" / "b" / "script.py")])
+    assert _matches(code_db, "what does main() do") == [("script.main", True)]
+
+
+def test_merge_definitions_puts_definitions_first_without_duplicates(code_db):
+    definitions = code_db.find_symbol_definitions("code", "what does main() do")
+    retrieved = code_db.get_vectorstore("code").similarity_search("print", k=3)
+    merged = merge_definitions(definitions, retrieved)
+    ids = [doc.metadata["id"] for doc in merged]
+    assert merged[:2] == definitions
+    assert len(ids) == len(set(ids))
+
+
+def test_lookup_on_missing_index_is_empty(tmp_path):
+    assert SymbolIndex(str(tmp_path / "missing.sqlite")).lookup(["main"]) == []
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from document_processor import DocumentProcessor
+from watcher import DirectoryWatcher, FilesNotLoaded, WatchIndexer
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    (directory / "a.md").write_text("# A\n\nalpha original\n", encoding="utf-8")
+    (directory / "b.md").write_text("# B\n\nbeta original\n", encoding="utf-8")
+    return directory
+
+
+def _ingest(vsm, processor, paths):
+    splitter = processor.get_text_splitter("Recursive", 500, 50)
+    documents = [doc for path in paths for doc in processor.load_file(path, splitter)]
+    assert vsm.add_documents("docs", documents, delay=0)
+
+
+def _texts(vsm):
+    return sorted(doc["content"] for doc in vsm.list_documents("docs"))
+
+
+def test_change_replaces_chunks_ingested_under_a_relative_path(vsm, docs_dir, monkeypatch):
+    monkeypatch.chdir(docs_dir.parent)
+    vsm.create_vectordb("docs")
+    processor = DocumentProcessor(vsm, llm=None)
+    _ingest(vsm, processor, [os.path.join("docs", "a.md")])
+    indexer = WatchIndexer(processor, "docs", ["md"], chunk_size=500, chunk_overlap=50, delay=0)
+
+    (docs_dir / "a.md").write_text("# A\n\nalpha changed\n", encoding="utf-8")
+    indexer({str(docs_dir / "a.md")})
+
+    texts = _texts(vsm)
+    assert any("alpha changed" in text for text in texts)
+    assert not any("alpha original" in text for text in texts)
+
+
+def test_file_that_fails_to_load_keeps_its_chunks(vsm, docs_dir, monkeypatch):
+    vsm.create_vectordb("docs")
+    processor = DocumentProcessor(vsm, llm=None)
+    _ingest(vsm, processor, [str(docs_dir / "a.md"), str(docs_dir / "b.md")])
+    indexer = WatchIndexer(processor, "docs", ["md"], chunk_size=500, chunk_overlap=50, delay=0)
+
+    load_file = processor.load_file
+    def failing_load_file(path, splitter):
+        if path.endswith("b.md"):
+            raise ValueError("unparsable")
+        return load_file(path, splitter)
+    monkeypatch.setattr(processor, "load_file", failing_load_file)
+    (docs_dir / "a.md").write_text("# A\n\nalpha changed\n", encoding="utf-8")
+    (docs_dir / "b.md").write_text("# B\n\nbeta changed\n", encoding="utf-8")
+
+    with pytest.raises(FilesNotLoaded) as error:
+        indexer({str(docs_dir / "a.md"), str(docs_dir / "b.md")})
+
+    assert error.value.paths == [os.path.realpath(docs_dir / "b.md")]
+    texts = _texts(vsm)
+    assert any("alpha changed" in text for text in texts)
+    assert any("beta original" in text for text in texts)
+
+
+def test_watcher_requeues_files_that_failed_to_load(tmp_path):
+    path = os.path.realpath(tmp_path / "b.md")
+
+    def on_changes(paths):
+        raise FilesNotLoaded([path], chunks=3)
+
+    watcher = DirectoryWatcher([str(tmp_path)], on_changes, use_inotify=False)
+    watcher._pending = {path: 1.0, os.path.realpath(tmp_path / "a.md"): 2.0}
+    watcher._flush()
+
+    assert watcher._pending == {path: 1.0}
+    assert watcher.files_indexed == 1
+    assert watcher.chunks_indexed == 3
@@ -0,0 +1,33 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """
+    Returns the cl100k_base tiktoken encoding, or False if it cannot be loaded
+    (tiktoken downloads the encoding on first use, which fails on offline hosts).
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Logged once: the failure is cached, so later calls fall back without retrying
+                logger.warning(f"tiktoken encoding unavailable ({e}); estimating token counts from text length.")
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Counts the tokens of a text for the OpenAI models, or estimates ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
@@ -0,0 +1,214 @@
+"""
+Lightweight per-stage tracing and metrics for the ingest, query and LLM paths.
+
+Code paths wrap their stages in spans:
+
+    with get_tracer().span("retrieve", k=50) as span:
+        docs = vectorstore.similarity_search_by_vector(embedding, k=50)
+        span.set(results=len(docs))
+
+Every span updates an in-process duration histogram per stage and counters can be
+added with `count`. Both are exported in the Prometheus text format (`prometheus()`,
+served by service.py under /metrics). A sampled subset of the spans, with their
+attributes and parent/child relations, is appended as JSON lines to a file.
+
+Configuration (environment):
+- TRACE_JSONL_PATH: file the sampled spans are appended to (disabled if unset).
+- TRACE_SAMPLE_RATE: fraction of traces exported to the JSONL file (default 0.1).
+- TRACE_LOG_BODIES: "1" allows logging document and prompt bodies at DEBUG level.
+
+Attributes never contain document bodies; only sizes, counts and identifiers.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+import contextlib
+import contextvars
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "sampled", "start_time", "duration", "error")
+
+    def __init__(self, name: str, attributes: dict, parent=None, sampled: bool = False):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = parent.sampled if parent else sampled
+        self.start_time = time.time()
+        self.duration = 0.0
+        self.error = None
+
+    def set(self, **attributes):
+        """Adds attributes, e.g. counts or byte sizes known only at the end of the stage."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.1, jsonl_path: str = None, log_bodies: bool = False, namespace: str = "wikichat"):
+        self.sample_rate = sample_rate
+        self.jsonl_path = jsonl_path
+        self.log_bodies = log_bodies
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._histograms = {}  # stage -> [bucket counts..., sum, count]
+        self._counters = {}    # (name, sorted labels) -> value
+        self._jsonl_file = None
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Times a stage; nested spans become children of the enclosing span of the same thread."""
+        parent = _current_span.get()
+        span = Span(name, attributes, parent, sampled=parent is None and random.random() < self.sample_rate)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, seconds: float, **attributes):
+        """Records a stage whose duration was measured elsewhere, e.g. across a generator."""
+        span = Span(name, attributes, _current_span.get(), sampled=random.random() < self.sample_rate)
+        span.start_time = time.time() - seconds
+        span.duration = seconds
+        self._finish(span)
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Adds to a counter, e.g. count("tokens", 120, stage="llm", kind="prompt")."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _finish(self, span: Span):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = [0] * (len(DURATION_BUCKETS) + 2)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += span.duration
+            histogram[-1] += 1
+            if span.error:
+                key = ("stage_errors", (("error", span.error), ("stage", span.name)))
+                self._counters[key] = self._counters.get(key, 0) + 1
+        if span.sampled and self.jsonl_path:
+            self._write(span.to_dict())
+
+    def _write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._jsonl_file is None:
+                    directory = os.path.dirname(self.jsonl_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._jsonl_file = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+                self._jsonl_file.write(line)
+            except OSError as e:
+                logger.warning(f"Disabling span export to {self.jsonl_path}: {e}")
+                self.jsonl_path = None
+
+    def snapshot(self) -> dict:
+        """Returns the aggregated metrics as a dict (per-stage count, total and mean seconds; counters)."""
+        with self._lock:
+            stages = {
+                name: {"count": values[-1], "total_seconds": round(values[-2], 6),
+                       "mean_ms": round(values[-2] / values[-1] * 1000, 3) if values[-1] else 0.0}
+                for name, values in self._histograms.items()
+            }
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {"stages": stages, "counters": counters}
+
+    def prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        prefix = self.namespace
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Duration of traced stages.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {name: list(values) for name, values in self._histograms.items()}
+            counters = dict(self._counters)
+        for name, values in sorted(histograms.items()):
+            label = f'stage="{_escape(name)}"'
+            for bound, bucket_count in zip(DURATION_BUCKETS, values):
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{{label},le="{bound}"}} {bucket_count}')
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f"{prefix}_stage_duration_seconds_sum{{{label}}} {values[-2]:.6f}")
+            lines.append(f"{prefix}_stage_duration_seconds_count{{{label}}} {values[-1]}")
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name != name:
+                    continue
+                label_text = ",".join(f'{key}="{_escape(str(label_value))}"' for key, label_value in labels)
+                value_text = _format_value(value)
+                lines.append(f"{prefix}_{name}_total{{{label_text}}} {value_text}" if label_text else f"{prefix}_{name}_total {value_text}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _format_value(value) -> str:
+    # Exact: integral counters (bytes, tokens) are printed as ints, others with full float precision
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Returns the process-wide tracer, configured from the environment."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(
+                sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.1")),
+                jsonl_path=os.getenv("TRACE_JSONL_PATH") or None,
+                log_bodies=os.getenv("TRACE_LOG_BODIES", "0") == "1",
+            )
+        return _tracer
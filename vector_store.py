@@ -1,33 +1,151 @@
 import os
 import glob
+import json
 import shutil
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
 from dotenv import load_dotenv
+from shared_resources import shared_resources
+from chunk_journal import ChunkJournal, JOURNAL_FILENAME
+from parent_store import ParentStore, PARENT_STORE_FILENAME
+from source_catalog import SourceCatalog, CATALOG_FILENAME
+from symbol_index import SymbolIndex, SYMBOL_INDEX_FILENAME, symbol_candidates
+from tracing import get_tracer
 
 import time
+import uuid
+import threading
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 load_dotenv()
 
+# langchain, chromadb and the OpenAI client are imported on first use, so pages and
+# workers that only list or manage vectordbs start without loading them.
+
+_shared_embeddings = {}
+_shared_embeddings_lock = threading.Lock()
+
+
+def get_shared_embeddings(model: str = None):
+    """
+    Returns the process-wide embeddings of an OpenAI embedding model (the client's default
+    model if None), used by every vectorstore handed out by VectorStoreManager, so the
+    query embedding cache and micro-batching are shared.
+    """
+    with _shared_embeddings_lock:
+        if model not in _shared_embeddings:
+            from langchain_community.embeddings import OpenAIEmbeddings
+            from embedding_cache import CachedQueryEmbeddings
+            kwargs = {"model": model} if model else {}
+            _shared_embeddings[model] = CachedQueryEmbeddings(
+                OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"), **kwargs),
+                max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048")),
+                batch_window_seconds=float(os.getenv("QUERY_EMBEDDING_BATCH_WINDOW_MS", "10")) / 1000,
+            )
+        return _shared_embeddings[model]
+
+
+def _open_chroma(db_path: str, embeddings):
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=db_path, embedding_function=embeddings)
+
+
+def _drop_chroma_system(db_path: str):
+    """
+    Forgets chromadb's process-wide system of a persist directory, so the next client
+    opened on it loads the collection (including its vector index) from disk again.
+    """
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+    except ImportError:  # chromadb < 0.5
+        from chromadb.api.client import SharedSystemClient
+    SharedSystemClient._identifier_to_system.pop(db_path, None)
+
+
+DB_VERSION_FILENAME = "db_version"
+EMBEDDING_CONFIG_FILENAME = "embedding.json"
+
+
 class VectorStoreManager:
-    def __init__(self, parent_dir="./vectordbs"):
+    # Version of every vectordb that the shared Chroma client of this process has seen.
+    # The version itself is stored in the vectordb directory and changes on every write,
+    # from any process (UI, service, watcher), so clients and caches built on top of a
+    # vectordb (e.g. the answer cache) can detect writes of other processes.
+    _db_versions = {}
+    _db_versions_lock = threading.Lock()
+
+    def __init__(self, parent_dir="./vectordbs", embeddings=None):
         self.parent_dir = parent_dir
+        self._embeddings = embeddings
         self._ensure_parent_dir()
 
+    @property
+    def embeddings(self):
+        """The embeddings passed to the constructor, or the shared default embeddings."""
+        if self._embeddings is None:
+            return get_shared_embeddings()
+        return self._embeddings
+
+    def get_embedding_model(self, db_name: str):
+        """Returns the embedding model a vectordb was created with, or None for the default model."""
+        try:
+            with open(os.path.join(self.get_db_path(db_name), EMBEDDING_CONFIG_FILENAME), "r", encoding="utf-8") as f:
+                return json.load(f).get("model")
+        except (OSError, ValueError):
+            return None
+
+    def get_embeddings(self, db_name: str):
+        """
+        Returns the embeddings for a vectordb: the ones passed to the constructor if any,
+        otherwise the shared embeddings of the model the vectordb was created with.
+        """
+        if self._embeddings is not None:
+            return self._embeddings
+        return get_shared_embeddings(self.get_embedding_model(db_name))
+
+    def get_db_path(self, db_name: str) -> str:
+        return os.path.abspath(os.path.join(self.parent_dir, db_name))
+
+    def get_db_version(self, db_name: str) -> int:
+        """Returns the version of a vectordb; it changes whenever any process writes to it."""
+        try:
+            with open(os.path.join(self.get_db_path(db_name), DB_VERSION_FILENAME), "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_db_version(self, db_name: str):
+        db_path = self.get_db_path(db_name)
+        # A timestamp instead of a counter, so concurrent writers never produce the same version
+        version = time.time_ns()
+        with self._db_versions_lock:
+            if os.path.isdir(db_path):
+                version_path = os.path.join(db_path, DB_VERSION_FILENAME)
+                tmp_path = f"{version_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(str(version))
+                os.replace(tmp_path, version_path)
+            # This process wrote the change through its own client, which is therefore current
+            self._db_versions[db_path] = version
+
     def _ensure_parent_dir(self):
         if not os.path.exists(self.parent_dir):
             os.makedirs(self.parent_dir)
 
-    def create_vectordb(self, db_name: str) -> bool:
+    def create_vectordb(self, db_name: str, embedding_model: str = None) -> bool:
+        """
+        Creates an empty vectordb. With embedding_model, the vectordb is embedded and
+        queried with that OpenAI embedding model instead of the default one.
+        """
         db_path = os.path.join(self.parent_dir, db_name)
         if os.path.exists(db_path):
             return False  # Vectordb already exists
         os.makedirs(db_path)
+        if embedding_model:
+            with open(os.path.join(db_path, EMBEDDING_CONFIG_FILENAME), "w", encoding="utf-8") as f:
+                json.dump({"model": embedding_model}, f)
         # Initialize empty Chroma vectorstore
-        embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
-        Chroma(persist_directory=db_path, embedding_function=embeddings)
+        _open_chroma(db_path, self.get_embeddings(db_name))
+        # A new vectordb is fully covered by its catalog from the start
+        self.get_catalog(db_name).mark_complete()
         return True
 
     def list_vectordbs(self) -> list:
@@ -38,32 +156,249 @@ class VectorStoreManager:
         db_path = os.path.join(self.parent_dir, db_name)
         if not os.path.exists(db_path):
             return False  # Vectordb does not exist
+        self._evict_vectorstore(db_name)
         shutil.rmtree(db_path)
+        self._bump_db_version(db_name)
         return True
 
     def get_vectorstore(self, db_name: str):
+        """
+        Returns the Chroma vectorstore of a vectordb. Instances are shared process-wide,
+        so every session and every call on the same vectordb reuses one client. The client
+        is reopened when another process has written to the vectordb in the meantime.
+        """
         db_path = os.path.join(self.parent_dir, db_name)
         if not os.path.exists(db_path):
             return None
-        embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
-        return Chroma(persist_directory=db_path, embedding_function=embeddings)
+        version = self.get_db_version(db_name)
+        with self._db_versions_lock:
+            seen = self._db_versions.setdefault(self.get_db_path(db_name), version)
+            stale = seen != version
+            self._db_versions[self.get_db_path(db_name)] = version
+        if stale:
+            # Another process (e.g. watcher.py) wrote to the vectordb since it was opened here
+            self._evict_vectorstore(db_name)
+            _drop_chroma_system(db_path)
+        embeddings = self.get_embeddings(db_name)
+        return shared_resources.get_or_create(
+            ("vectorstore", self.get_db_path(db_name), id(embeddings)),
+            lambda: _open_chroma(db_path, embeddings)
+        )
+
+    def _evict_vectorstore(self, db_name: str):
+        db_path = self.get_db_path(db_name)
+        shared_resources.evict(lambda key: key[0] == "vectorstore" and key[1] == db_path)
 
     def add_documents(self, db_name: str, documents: list, batch_size: int = 5, delay: float = 1.0) -> bool:
         vectorstore = self.get_vectorstore(db_name)
         if vectorstore is None:
             return False
+        tracer = get_tracer()
         try:
+            journal = self.get_journal(db_name)
+            catalog = self.get_catalog(db_name)
+            symbols = self.get_symbol_index(db_name)
+            # Parent sections (parent-document mode) are not embedded, only stored by id
+            parents = [doc for doc in documents if doc.metadata.get("is_parent")]
+            if parents:
+                self.get_parent_store(db_name).put_many(parents)
+                journal.append_chunks(parents)
+                symbols.add_chunks(parents)
+                documents = [doc for doc in documents if not doc.metadata.get("is_parent")]
             for i in range(0, len(documents), batch_size):
                 batch = documents[i:i + batch_size]
-                vectorstore.add_documents(documents=batch)
-                vectorstore.persist()
-                time.sleep(delay)  # Add delay between batches to prevent rate limiting
+                # Store chunks under their metadata id so they can be deleted and journaled by id
+                ids = [doc.metadata.setdefault("id", str(uuid.uuid4())) for doc in batch]
+                texts = [doc.page_content for doc in batch]
+                batch_bytes = sum(len(text.encode("utf-8")) for text in texts)
+                # Embed explicitly instead of via add_documents so both stages are traced separately
+                with tracer.span("embed", kind="documents", chunks=len(batch), bytes=batch_bytes):
+                    embeddings = vectorstore.embeddings.embed_documents(texts)
+                with tracer.span("persist", db=db_name, chunks=len(batch)):
+                    vectorstore._collection.upsert(
+                        ids=ids, embeddings=embeddings, documents=texts, metadatas=[doc.metadata for doc in batch]
+                    )
+                    vectorstore.persist()
+                tracer.count("embedded_chunks", len(batch))
+                tracer.count("embedded_bytes", batch_bytes)
+                journal.append_chunks(batch)
+                catalog.add_chunks(batch)
+                symbols.add_chunks(batch)
+                if delay:
+                    time.sleep(delay)  # Add delay between batches to prevent rate limiting
             return True
         except Exception as e:
             print(f"Error adding documents to vectordb '{db_name}': {e}")
-            return False    
+            return False
+        finally:
+            self._bump_db_version(db_name)
+
+    def get_journal(self, db_name: str) -> ChunkJournal:
+        """Returns the append-only chunk journal of a vectordb (see chunk_journal.py)."""
+        return ChunkJournal(os.path.join(self.get_db_path(db_name), JOURNAL_FILENAME))
+
+    def get_catalog(self, db_name: str) -> SourceCatalog:
+        """Returns the source catalog of a vectordb (see source_catalog.py)."""
+        return SourceCatalog(os.path.join(self.get_db_path(db_name), CATALOG_FILENAME))
+
+    def get_symbol_index(self, db_name: str) -> SymbolIndex:
+        """Returns the Python symbol index of a vectordb (see symbol_index.py)."""
+        return SymbolIndex(os.path.join(self.get_db_path(db_name), SYMBOL_INDEX_FILENAME))
+
+    def rebuild_catalog(self, db_name: str, page_size: int = 5000) -> dict:
+        """
+        Rebuilds the source catalog and the symbol index from a full scan of the collection,
+        e.g. for vectordbs created before they existed. Afterwards both are kept in sync.
 
-    def list_documents(self, db_name: str) -> list:
+        Returns:
+        - totals (dict): The number of sources, chunks and tokens.
+        """
+        vectorstore = self.get_vectorstore(db_name)
+        if vectorstore is None:
+            raise ValueError(f"Vectordb '{db_name}' does not exist.")
+        from langchain_core.documents import Document
+        catalog = self.get_catalog(db_name)
+        catalog.reset()
+        symbols = self.get_symbol_index(db_name)
+        symbols.reset()
+        offset = 0
+        while True:
+            page = vectorstore._collection.get(include=["metadatas", "documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            documents = [
+                Document(page_content=text or "", metadata={**(metadata or {}), "id": chunk_id})
+                for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+            ]
+            catalog.add_chunks(documents)
+            symbols.add_chunks(documents)
+            offset += len(page["ids"])
+        catalog.mark_complete()
+        return catalog.totals()
+
+    def find_symbol_definitions(self, db_name: str, query: str, limit: int = 8) -> list:
+        """
+        Returns the definition chunks of the code symbols named in a query, looked up in the
+        symbol index without an embedding call. Empty if the query names no known symbol.
+        Callers may answer from exact matches (metadata['symbol_exact']) alone; ambiguous
+        ones are merged into the similarity search results (see symbol_index.merge_definitions).
+
+        Returns:
+        - documents (list): Definition chunks (or class parent sections) in the order of the
+          matches, with the matched symbol in metadata['symbol'].
+        """
+        definitions = self.get_symbol_index(db_name).lookup(symbol_candidates(query), limit)
+        if not definitions:
+            return []
+        from langchain_core.documents import Document
+        chunk_ids = list(dict.fromkeys(definition["chunk_id"] for definition in definitions))
+        found = self.get_parent_store(db_name).get_many(chunk_ids)
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in found]
+        if missing:
+            vectorstore = self.get_vectorstore(db_name)
+            if vectorstore is not None:
+                page = vectorstore._collection.get(ids=missing, include=["metadatas", "documents"])
+                for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    found[chunk_id] = (text, metadata or {})
+
+        documents = []
+        for chunk_id in chunk_ids:
+            if chunk_id not in found:
+                continue  # Deleted from the collection without the index noticing
+            text, metadata = found[chunk_id]
+            matches = [definition for definition in definitions if definition["chunk_id"] == chunk_id]
+            documents.append(Document(page_content=text, metadata={
+                **metadata, "symbol": matches[0]["qualified_name"], "symbol_kind": matches[0]["kind"],
+                "symbol_exact": any(definition["exact"] for definition in matches),
+            }))
+        return documents
+
+    def get_parent_store(self, db_name: str) -> ParentStore:
+        """Returns the store of parent sections of a vectordb (see parent_store.py)."""
+        return ParentStore(os.path.join(self.get_db_path(db_name), PARENT_STORE_FILENAME))
+
+    def expand_to_parents(self, db_name: str, documents: list) -> list:
+        """
+        Replaces child chunks by their parent sections. Children of the same parent are
+        deduplicated, so the result keeps the rank of each parent's best child; chunks
+        without a parent are passed through.
+
+        Returns:
+        - documents (list): Parent documents with the matched child ids in metadata['matched_children'].
+        """
+        parent_ids = [doc.metadata["parent_id"] for doc in documents if doc.metadata.get("parent_id")]
+        if not parent_ids:
+            return documents
+        from langchain_core.documents import Document
+        parents = self.get_parent_store(db_name).get_many(list(dict.fromkeys(parent_ids)))
+
+        expanded = []
+        by_parent = {}
+        for doc in documents:
+            parent_id = doc.metadata.get("parent_id")
+            if parent_id not in parents:
+                expanded.append(doc)
+                continue
+            if parent_id not in by_parent:
+                text, metadata = parents[parent_id]
+                by_parent[parent_id] = Document(page_content=text, metadata={**metadata, "matched_children": []})
+                expanded.append(by_parent[parent_id])
+            by_parent[parent_id].metadata["matched_children"].append(doc.metadata.get("id"))
+        return expanded
+
+    def rebuild_from_journal(self, db_name: str, journal_path: str, batch_size: int = 64, delay: float = 0.0) -> int:
+        """
+        Adds all live chunks of a journal to a vectordb without re-parsing source files,
+        embedding them with the target vectordb's embeddings (see get_embeddings). Creates the
+        vectordb if needed; an existing one is cleared first, so none of its previous chunks
+        survives in the collection or its sidecars (catalog, parents, symbols, journal).
+
+        Returns:
+        - count (int): The number of chunks added.
+        """
+        if os.path.abspath(journal_path) == os.path.abspath(self.get_journal(db_name).path):
+            raise ValueError(f"Cannot rebuild vectordb '{db_name}' from its own journal.")
+        if not self.create_vectordb(db_name):
+            self._clear_vectordb(db_name)
+        from langchain_core.documents import Document
+
+        count = 0
+        batch = []
+        for record in ChunkJournal(journal_path).iter_live_chunks():
+            batch.append(Document(page_content=record["text"], metadata=record["metadata"]))
+            if len(batch) >= batch_size:
+                if not self.add_documents(db_name, batch, batch_size=batch_size, delay=delay):
+                    raise RuntimeError(f"Failed to add chunks to vectordb '{db_name}'.")
+                count += len(batch)
+                batch = []
+        if batch:
+            if not self.add_documents(db_name, batch, batch_size=batch_size, delay=delay):
+                raise RuntimeError(f"Failed to add chunks to vectordb '{db_name}'.")
+            count += len(batch)
+        return count
+
+    def _clear_vectordb(self, db_name: str, page_size: int = 5000):
+        """Deletes all chunks of a vectordb and resets its sidecars, keeping its embedding model."""
+        vectorstore = self.get_vectorstore(db_name)
+        if vectorstore is None:
+            raise ValueError(f"Vectordb '{db_name}' does not exist.")
+        ids = vectorstore._collection.get(include=[])["ids"]
+        for i in range(0, len(ids), page_size):
+            vectorstore._collection.delete(ids=ids[i:i + page_size])
+        vectorstore.persist()
+        catalog = self.get_catalog(db_name)
+        catalog.reset()
+        catalog.mark_complete()
+        self.get_parent_store(db_name).reset()
+        self.get_symbol_index(db_name).reset()
+        self.get_journal(db_name).reset()
+        self._bump_db_version(db_name)
+
+    def list_documents(self, db_name: str, limit: int = None, offset: int = 0, source: str = None) -> list:
+        """
+        Returns the chunks of a vectordb as dicts with content and metadata. Pass limit and
+        offset to page through large collections, and source to list one file's chunks.
+        """
         vectorstore = self.get_vectorstore(db_name)
         if vectorstore is None:
             print(f"Vectordb '{db_name}' does not exist.")
@@ -71,7 +406,10 @@ class VectorStoreManager:
 
         try:
             # Use Chroma's retriever to fetch metadata
-            docs_with_metadata = vectorstore._collection.get(include=['metadatas', 'documents'])
+            docs_with_metadata = vectorstore._collection.get(
+                include=['metadatas', 'documents'], limit=limit, offset=offset or None,
+                where={"source": source} if source else None
+            )
             documents = zip(docs_with_metadata['documents'], docs_with_metadata['metadatas'])
 
             # Return structured data
@@ -94,7 +432,42 @@ class VectorStoreManager:
         try:
             vectorstore._collection.delete(ids=[document_id])
             vectorstore.persist()
+            self.get_catalog(db_name).delete_ids([document_id])
+            self.get_parent_store(db_name).delete_ids([document_id])
+            self.get_symbol_index(db_name).delete_ids([document_id])
+            self.get_journal(db_name).append_deletes(ids=[document_id])
+            self._bump_db_version(db_name)
             return True
         except Exception as e:
             print(f"Error deleting document '{document_id}' from vectordb '{db_name}': {e}")
             return False
+
+    def delete_documents_by_source(self, db_name: str, sources: list) -> bool:
+        """
+        Deletes all chunks whose 'source' metadata is one of the given file paths.
+        With a complete source catalog the chunks are deleted by id, otherwise with a
+        metadata filter that scans the collection.
+        """
+        vectorstore = self.get_vectorstore(db_name)
+        if vectorstore is None:  # An empty Chroma store is falsy
+            return False
+        if not sources:
+            return True
+        try:
+            catalog = self.get_catalog(db_name)
+            if catalog.is_complete():
+                ids = catalog.chunk_ids(sources)
+                if ids:
+                    vectorstore._collection.delete(ids=ids)
+            else:
+                vectorstore._collection.delete(where={"source": {"$in": list(sources)}})
+            vectorstore.persist()
+            catalog.delete_sources(sources)
+            self.get_parent_store(db_name).delete_sources(sources)
+            self.get_symbol_index(db_name).delete_sources(sources)
+            self.get_journal(db_name).append_deletes(sources=sources)
+            self._bump_db_version(db_name)
+            return True
+        except Exception as e:
+            print(f"Error deleting documents of {len(sources)} source(s) from vectordb '{db_name}': {e}")
+            return False
@@ -0,0 +1,116 @@
+"""
+Warm-up hook that moves the cold-start cost of a new server process off the first request.
+
+Importing langchain/chromadb and opening the Chroma collections takes seconds, which
+the first chat turn (or first service request) of every new worker would otherwise
+pay. `warmup()` imports the heavy dependencies and pre-opens the shared
+VectorStoreManager, its vectordbs and the LLM client. The Streamlit pages call
+`start_background_warmup()`, which runs it once per process in a daemon thread.
+
+Configuration (environment):
+- WARMUP_ON_START: "0" disables the background warm-up (default "1").
+- WARMUP_PARENT_DIR: parent directory of the vectordbs (default "./chroma_db").
+- WARMUP_VECTORDBS: comma-separated vectordb names, "*" for all (default "*").
+- WARMUP_MODEL / WARMUP_TEMPERATURE: the LLM client to create (default gpt-4o-mini / 0.7).
+- WARMUP_EMBED_QUERY: "1" also embeds a dummy query to open the OpenAI connection.
+
+    python warmup.py --parent-dir ./chroma_db    # prints the time of each step
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def _import_dependencies():
+    import langchain_core.documents  # noqa: F401
+    import langchain_community.vectorstores.chroma  # noqa: F401
+    import langchain_community.chat_models.openai  # noqa: F401
+
+
+def warmup(parent_dir: str = "./chroma_db", db_names: list = None, model: str = "gpt-4o-mini", temperature: float = 0.7,
+           embed_query: bool = False, vectorstore_manager=None, llm_handler=None) -> dict:
+    """
+    Imports the heavy dependencies and pre-opens the shared clients.
+
+    Args:
+    - parent_dir (str): Parent directory of the vectordbs.
+    - db_names (list): Vectordbs to open; None opens all of them.
+    - model (str), temperature (float): The shared LLMHandler to create.
+    - embed_query (bool): Also embed a dummy query (one embedding API call).
+    - vectorstore_manager, llm_handler: Use these instead of the shared instances.
+
+    Returns:
+    - timings (dict): Seconds per step.
+    """
+    from shared_resources import get_llm_handler, get_vectorstore_manager
+
+    timings = {}
+
+    def timed(step, func):
+        start = time.perf_counter()
+        result = func()
+        timings[step] = round(time.perf_counter() - start, 4)
+        return result
+
+    timed("imports", _import_dependencies)
+    vsm = vectorstore_manager or timed("vectorstore_manager", lambda: get_vectorstore_manager(parent_dir))
+    timed("embeddings", lambda: vsm.embeddings)
+    timed("llm_handler", lambda: llm_handler or get_llm_handler(model=model, temperature=temperature))
+
+    for db_name in vsm.list_vectordbs() if db_names is None else db_names:
+        # count() makes Chroma load the collection's segments, not just create the client
+        vectorstore = timed(f"open:{db_name}", lambda: vsm.get_vectorstore(db_name))
+        if vectorstore is not None:
+            timed(f"count:{db_name}", vectorstore._collection.count)
+    if embed_query:
+        timed("embed_query", lambda: vsm.embeddings.embed_query("warm-up"))
+    timings["total"] = round(sum(timings.values()), 4)
+    return timings
+
+
+def start_background_warmup():
+    """Runs `warmup()` once per process in a daemon thread, configured from the environment."""
+    global _started
+    with _started_lock:
+        if _started or os.getenv("WARMUP_ON_START", "1") == "0":
+            return
+        _started = True
+
+    db_names = os.getenv("WARMUP_VECTORDBS", "*").strip()
+
+    def run():
+        try:
+            timings = warmup(
+                parent_dir=os.getenv("WARMUP_PARENT_DIR", "./chroma_db"),
+                db_names=None if db_names == "*" else [name.strip() for name in db_names.split(",") if name.strip()],
+                model=os.getenv("WARMUP_MODEL", "gpt-4o-mini"),
+                temperature=float(os.getenv("WARMUP_TEMPERATURE", "0.7")),
+                embed_query=os.getenv("WARMUP_EMBED_QUERY", "0") == "1",
+            )
+            logger.info(f"Warm-up finished in {timings['total']:.2f} s: {timings}")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import dependencies and pre-open vectordbs, printing the time of each step.")
+    parser.add_argument("--parent-dir", default="./chroma_db", help="Parent directory of the vectordbs.")
+    parser.add_argument("--db", action="append", help="Vectordb to open (repeatable); default all.")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--embed-query", action="store_true", help="Also embed a dummy query.")
+    args = parser.parse_args()
+    print(json.dumps(warmup(args.parent_dir, args.db, args.model, embed_query=args.embed_query), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Watch mode: keeps a vectordb in sync with documentation directories that change
+during the day.
+
+    python watcher.py --db wiki --dir ./docs --dir ./handbook --types md py [--metrics-port 9102]
+
+Changes are detected with inotify on Linux and with mtime polling elsewhere. Bursts
+of events are debounced and only the affected files are re-indexed through
+DocumentProcessor.load_file / VectorStoreManager.add_documents. Paths are compared by
+their real path, so a vectordb ingested through a relative or symlinked directory is
+updated in place. A file that fails to load keeps its previous chunks and is retried.
+Update lag is recorded as the "watch_update_lag" stage of tracing.py; with
+--metrics-port the watcher serves it on its own GET /metrics like service.py.
+
+The watcher runs as its own process. Every write bumps the version stored in the
+vectordb directory, so the Chat page and service.py reopen their Chroma clients and
+stop serving cached answers of the old version on their next query.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import logging
+import argparse
+import threading
+from collections import deque
+
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+def _walk_dirs(directory):
+    for root, dirs, _ in os.walk(directory):
+        dirs[:] = [d for d in dirs if not _is_hidden(d)]
+        yield root
+
+
+class InotifyBackend:
+    """Recursive inotify watches via ctypes (Linux only)."""
+    def __init__(self, directories):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = directories
+        self._watches = {}  # wd -> directory path
+        for directory in directories:
+            for path in _walk_dirs(directory):
+                self._watch(path)
+
+    def _watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            logger.warning(f"Cannot watch {path}: {os.strerror(err)}")
+            return
+        self._watches[wd] = path
+
+    def poll(self, timeout: float) -> set:
+        """Returns the paths that changed, waiting up to timeout seconds for the first event."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed; re-indexing all watched files.")
+                changed.update(self.all_files())
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            name = os.fsdecode(name)
+            if _is_hidden(name):
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may have been written before the new watch was in place
+                    for sub_directory in _walk_dirs(path):
+                        self._watch(sub_directory)
+                    changed.update(_files_below(path))
+                elif mask & IN_MOVED_FROM:
+                    changed.add(path + os.sep)  # marker: everything below this directory
+                continue
+            changed.add(path)
+        return changed
+
+    def all_files(self) -> set:
+        files = set()
+        for directory in self.directories:
+            files.update(_files_below(directory))
+        return files
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """
+    Portable fallback: compares (mtime, size) of every file against the previous scan.
+    Only directory entries are stat'ed; file contents are never read.
+    """
+    def __init__(self, directories, interval: float = 2.0):
+        self.directories = directories
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        stack = list(self.directories)
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if _is_hidden(entry.name):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                continue
+        return snapshot
+
+    def poll(self, timeout: float) -> set:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        changed.update(path for path in self._snapshot if path not in snapshot)
+        self._snapshot = snapshot
+        return changed
+
+    def all_files(self) -> set:
+        return set(self._snapshot)
+
+    def close(self):
+        pass
+
+
+def _files_below(directory) -> set:
+    files = set()
+    for root in _walk_dirs(directory):
+        try:
+            files.update(os.path.join(root, name) for name in os.listdir(root)
+                         if not _is_hidden(name) and os.path.isfile(os.path.join(root, name)))
+        except FileNotFoundError:
+            continue
+    return files
+
+
+class FilesNotLoaded(RuntimeError):
+    """Raised by WatchIndexer when some changed files could not be loaded; the others were indexed."""
+    def __init__(self, paths: list, chunks: int):
+        super().__init__(f"{len(paths)} changed file(s) could not be loaded: {', '.join(paths)}")
+        self.paths = paths
+        self.chunks = chunks
+
+
+class WatchIndexer:
+    """Re-indexes changed files: loads the current content, then replaces their old chunks."""
+    def __init__(self, document_processor, db_name: str, file_types: list, splitter_type="Recursive",
+                 chunk_size=2000, chunk_overlap=200, batch_size=5, delay=1.0):
+        self.document_processor = document_processor
+        self.db_name = db_name
+        self.file_types = file_types
+        self.extensions = tuple(f".{file_type.lower()}" for file_type in file_types)
+        self.splitter_type = splitter_type
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.delay = delay
+
+    def matches(self, path: str) -> bool:
+        return path.lower().endswith(self.extensions)
+
+    def _indexed_sources(self) -> dict:
+        """Maps the real path of every indexed source to the source paths as they were stored."""
+        vectorstore_manager = self.document_processor.vectorstore_manager
+        catalog = vectorstore_manager.get_catalog(self.db_name)
+        if catalog.is_complete():
+            sources = {row["source"] for row in catalog.list_sources()}
+        else:
+            sources = {document["metadata"].get("source") for document in vectorstore_manager.list_documents(self.db_name)}
+        indexed = {}
+        for source in filter(None, sources):
+            indexed.setdefault(os.path.realpath(source), []).append(source)
+        return indexed
+
+    def __call__(self, paths: set) -> int:
+        vectorstore_manager = self.document_processor.vectorstore_manager
+        indexed = self._indexed_sources()
+        # A directory that was moved away is marked with a trailing separator; its files are only known to the index
+        removed_dirs = [os.path.join(os.path.realpath(path), "") for path in paths if path.endswith(os.sep)]
+        paths = {os.path.realpath(path) for path in paths if not path.endswith(os.sep)}
+        for directory in removed_dirs:
+            paths.update(path for path in indexed if path.startswith(directory))
+
+        paths = {path for path in paths if self.matches(path)}
+        if not paths:
+            return 0
+
+        # Load before deleting, so a file that fails to load keeps its previous chunks
+        text_splitter = self.document_processor.get_text_splitter(self.splitter_type, self.chunk_size, self.chunk_overlap)
+        documents, loaded, failed = [], [], []
+        for path in sorted(path for path in paths if os.path.isfile(path)):
+            try:
+                documents.extend(self.document_processor.load_file(path, text_splitter))
+                loaded.append(path)
+            except Exception:
+                logger.exception(f"Error processing changed file {path}")
+                failed.append(path)
+
+        replaced = [path for path in paths if path not in failed]
+        # Sources stored under another spelling of the same path (relative, symlinked) are replaced too
+        to_delete = sorted({source for path in replaced for source in indexed.get(path, [])} | set(replaced))
+        if not vectorstore_manager.delete_documents_by_source(self.db_name, to_delete):
+            raise RuntimeError(f"Failed to delete outdated chunks from vectordb '{self.db_name}'.")
+        if documents and not vectorstore_manager.add_documents(self.db_name, documents, batch_size=self.batch_size, delay=self.delay):
+            raise RuntimeError(f"Failed to add changed documents to vectordb '{self.db_name}'.")
+        if failed:
+            raise FilesNotLoaded(failed, len(documents))
+        return len(documents)
+
+
+class DirectoryWatcher:
+    """
+    Debounces file system events and hands batches of changed paths to `on_changes`.
+
+    A batch is flushed once no new event arrived for `debounce_seconds`, or at the
+    latest when its oldest change has waited `max_staleness_seconds`, so a constantly
+    changing directory still gets indexed. Update lag (time from the first detected
+    change of a file until it is indexed) is tracked in `metrics()` and recorded as the
+    "watch_update_lag" stage histogram of the tracer.
+    """
+    def __init__(self, directories, on_changes, debounce_seconds: float = 2.0, max_staleness_seconds: float = 30.0,
+                 poll_interval: float = 2.0, use_inotify: bool = None):
+        self.directories = [os.path.realpath(directory) for directory in directories]
+        self.on_changes = on_changes
+        self.debounce_seconds = debounce_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        self.backend = None
+        if use_inotify:
+            try:
+                self.backend = InotifyBackend(self.directories)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable ({e}); falling back to mtime polling.")
+        if self.backend is None:
+            self.backend = PollingBackend(self.directories, interval=min(poll_interval, debounce_seconds))
+        self._pending = {}  # path -> time of first event
+        self._last_event = 0.0
+        self._stop = threading.Event()
+        self._lags = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.files_indexed = 0
+        self.chunks_indexed = 0
+        self.errors = 0
+
+    def run(self):
+        logger.info(f"Watching {', '.join(self.directories)} with {type(self.backend).__name__}")
+        try:
+            while not self._stop.is_set():
+                changed = self.backend.poll(timeout=min(self.debounce_seconds, 1.0))
+                now = time.time()
+                for path in changed:
+                    self._pending.setdefault(path, now)
+                if changed:
+                    self._last_event = now
+                if self._pending and self._should_flush(now):
+                    self._flush()
+        finally:
+            self.backend.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def _should_flush(self, now) -> bool:
+        quiet = now - self._last_event >= self.debounce_seconds
+        stale = now - min(self._pending.values()) >= self.max_staleness_seconds
+        return quiet or stale
+
+    def _flush(self):
+        batch, self._pending = self._pending, {}
+        try:
+            chunks = self.on_changes(set(batch))
+        except FilesNotLoaded as e:
+            logger.warning(f"{e}; retrying them with the next batch.")
+            self.errors += 1
+            # Only the files that failed wait for another attempt; the rest of the batch is indexed
+            first_seen = min(batch.values())
+            for path in e.paths:
+                self._pending.setdefault(path, batch.get(path, first_seen))
+            self._last_event = time.time()
+            self._record_indexed({path: seen for path, seen in batch.items() if path not in e.paths}, e.chunks)
+            return
+        except Exception as e:
+            logger.error(f"Failed to index {len(batch)} changed file(s): {e}")
+            self.errors += 1
+            # Keep the changes so they are retried with the next batch
+            for path, first_seen in batch.items():
+                self._pending.setdefault(path, first_seen)
+            self._last_event = time.time()
+            return
+        self._record_indexed(batch, chunks)
+
+    def _record_indexed(self, batch: dict, chunks):
+        if not batch:
+            return
+        done = time.time()
+        lags = [done - first_seen for first_seen in batch.values()]
+        tracer = get_tracer()
+        for lag in lags:
+            tracer.record("watch_update_lag", lag)
+        with self._lock:
+            self.batches += 1
+            self.files_indexed += len(batch)
+            self.chunks_indexed += chunks or 0
+            self._lags.extend(lags)
+        logger.info(f"Indexed {len(batch)} changed file(s), max lag {max(lags):.1f}s")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+        def percentile(p):
+            return lags[min(len(lags) - 1, int(p * len(lags)))] if lags else None
+        return {
+            "backend": type(self.backend).__name__,
+            "batches": self.batches,
+            "files_indexed": self.files_indexed,
+            "chunks_indexed": self.chunks_indexed,
+            "errors": self.errors,
+            "pending": len(self._pending),
+            "lag_p50_s": percentile(0.5),
+            "lag_p95_s": percentile(0.95),
+            "lag_max_s": lags[-1] if lags else None,
+        }
+
+
+def serve_metrics(host: str, port: int) -> threading.Thread:
+    """Serves GET /metrics (Prometheus text, ?format=json) of this process's tracer on a daemon thread."""
+    import asyncio
+    from http_server import HTTPError, Response, serve
+
+    async def handle(request):
+        if request.path != "/metrics":
+            raise HTTPError(404, f"No route for {request.method} {request.path}")
+        if request.query_param("format") == "json":
+            return Response(200, get_tracer().snapshot())
+        return Response(200, get_tracer().prometheus(), content_type="text/plain; version=0.0.4")
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve(handle, host, port)), name="watch-metrics", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a vectordb in sync with changing directories.")
+    parser.add_argument("--parent-dir", default="./chroma_db", help="Parent directory of the vectordbs.")
+    parser.add_argument("--db", required=True, help="Name of the vectordb to update.")
+    parser.add_argument("--dir", action="append", required=True, help="Directory to watch (repeatable).")
+    parser.add_argument("--types", nargs="+", default=["md"], help="File types to index.")
+    parser.add_argument("--splitter", default="Recursive", choices=["Recursive", "Markdown"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--parent-chunk-size", type=int, help="Enable parent-document mode with parents of this size.")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds without events before indexing.")
+    parser.add_argument("--max-staleness", type=float, default=30.0, help="Maximum seconds a change waits before indexing.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Scan interval of the polling fallback.")
+    parser.add_argument("--polling", action="store_true", help="Force mtime polling instead of inotify.")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--metrics-port", type=int, help="Serve GET /metrics (update lag, ingest stages) on this port.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    from document_processor import DocumentProcessor
+    from vector_store import VectorStoreManager
+
+    vectorstore_manager = VectorStoreManager(parent_dir=args.parent_dir)
+    if args.db not in vectorstore_manager.list_vectordbs():
+        parser.error(f"Vectordb '{args.db}' does not exist in {args.parent_dir}.")
+    processor = DocumentProcessor(vectorstore_manager, llm=None, parent_chunk_size=args.parent_chunk_size)
+    indexer = WatchIndexer(processor, args.db, args.types, args.splitter, args.chunk_size, args.chunk_overlap)
+    if args.metrics_port:
+        serve_metrics(args.metrics_host, args.metrics_port)
+    watcher = DirectoryWatcher(args.dir, indexer, args.debounce, args.max_staleness, args.poll_interval,
+                               use_inotify=False if args.polling else None)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"Watch metrics: {watcher.metrics()}")
+
+
+if __name__ == "__main__":
+    main()